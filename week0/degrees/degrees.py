@@ -1,7 +1,14 @@
+import argparse
 import csv
+import itertools
+import json
+import multiprocessing
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import CompactGraph, load_cached
+from landmarks import load_or_build
+from nameindex import NameIndex
+from util import NeighborCache, all_shortest_paths, bidirectional_search
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +19,30 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-interned store, used instead of people and movies when loaded
+graph = None
+
+# Compact copy of people and movies, built for distance maps without graph
+distance_graph = None
+
+# Landmark distance index guiding shortest_path, when loaded
+landmark_index = None
+
+# Prefix and typo-tolerant index of names, built when first needed
+name_index = None
+
+# Bounded cache of the neighbors of people expanded, when enabled
+neighbor_cache = None
+
 
 def load_data(directory):
     """
     Load data from CSV files into memory.
     """
+    global distance_graph, name_index
+    distance_graph = None
+    name_index = None
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -52,15 +78,111 @@ def load_data(directory):
                 pass
 
 
-def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+def load_graph(directory, processes=1):
+    """
+    Load CSV files into the compact graph store instead of
+    the people and movies dictionaries.
+    A binary snapshot of the store is reused while the CSV files don't change,
+    else stars.csv is parsed across `processes` processes.
+    """
+    global graph, name_index
+    graph = load_cached(directory, processes)
+    for person_id, name in zip(graph.person_ids, graph.names):
+        names.setdefault(name.lower(), set()).add(person_id)
+    name_index = None
+
+
+def build_name_index():
+    """
+    Build the name index from whichever store is loaded.
+    """
+    global name_index
+    if graph is not None:
+        name_index = NameIndex(
+            (person_id, graph.names[i], graph.births[i],
+             len(graph.movies_for(i)))
+            for i, person_id in enumerate(graph.person_ids)
+        )
+    else:
+        name_index = NameIndex(
+            (person_id, person["name"], person["birth"],
+             len(person["movies"]))
+            for person_id, person in people.items()
+        )
+
+
+def load_landmarks(directory, k=16):
+    """
+    Load or build the landmark distance index of a directory,
+    once its data has been loaded.
+    """
+    global landmark_index
+    if graph is not None:
+        person_ids = graph.person_ids
+
+        def degree(person_id):
+            return len(graph.movies_for(graph.person_index[person_id]))
+    else:
+        person_ids = list(people)
 
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+        def degree(person_id):
+            return len(people[person_id]["movies"])
+
+    landmark_index = load_or_build(directory, person_ids, degree,
+                                   distances_from, k)
+
+
+def enable_neighbor_cache(max_entries):
+    """
+    Cache the neighbors of expanded people, keeping at most `max_entries`
+    (movie_id, person_id) pairs in memory, least recently used first out.
+    Returns the cache, whose stats() include hits and misses.
+    """
+    global neighbor_cache
+    neighbor_cache = NeighborCache(max_entries)
+    if graph is not None:
+        graph.neighbor_cache = neighbor_cache
+    return neighbor_cache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="load data into the compact graph store")
+    parser.add_argument("--landmarks", type=int, metavar="K",
+                        help="guide searches with a K landmarks index")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab-separated source/target pairs read "
+                             "from FILE ('-' for stdin) as JSON lines")
+    parser.add_argument("--processes", type=int,
+                        help="number of worker processes, to ingest CSV "
+                             "files in compact mode and in batch mode")
+    args = parser.parse_args()
+
+    # Load data from files into memory, stdout is kept for batch results
+    log = sys.stderr if args.batch else sys.stdout
+    print("Loading data...", file=log)
+    if args.compact:
+        load_graph(args.directory, args.processes or 1)
+        for name, stats in graph.ingest_stats.items():
+            print(f"{name}: {stats['rows']} rows, "
+                  f"{stats['rows_per_second']:.0f} rows/sec", file=log)
+    else:
+        load_data(args.directory)
+    if args.landmarks:
+        load_landmarks(args.directory, args.landmarks)
+    print("Data loaded.", file=log)
+
+    if args.batch:
+        if args.batch == "-":
+            lines = sys.stdin
+        else:
+            lines = open(args.batch, encoding="utf-8")
+        with lines:
+            for answer in batch_queries(lines, args.processes):
+                print(answer)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -78,9 +200,9 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_name(path[i][1])
+            person2 = person_name(path[i + 1][1])
+            movie = movie_title(path[i + 1][0])
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
@@ -91,56 +213,155 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
-    neighbors = neighbors_for_person(source)
+    # Landmarks prove some pairs are not connected without any search.
+    # Their bounds rarely prune a bidirectional search enough to pay for
+    # checking them, so connected pairs are searched without the index
+    if (landmark_index is not None
+            and landmark_index.bounds(source, target) is None):
+        return None
 
-    # Shortest path means BFS, then the frontier is a queue
-    frontier = QueueFrontier()
+    if graph is not None:
+        return graph.shortest_path(source, target)
 
-    # Set of explored states
-    explored = set()
+    # Grow the search from both ends and stop as soon as they meet,
+    # each side only has to go half the degrees of separation deep
+    return bidirectional_search(source, target, neighbors_for_person)
 
-    # Path to be returned (if any)
-    path = []
 
-    # Add all the actors staring with source in the frontier, with their movies
-    for neighbor in neighbors:
-        start = Node(state=neighbor, parent=None, action=None)
+def shortest_paths(source, target, limit=None):
+    """
+    Lazily yields every shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, at most `limit` of them.
 
-        # If the source and the target stare in the same movie :
-        if target in start.state[1]:
-            path.append([start.state[0], start.state[1]])
-            return path
+    Yields nothing if there is no possible path.
+    """
+    if graph is not None:
+        paths = graph.all_shortest_paths(source, target)
+    else:
+        paths = all_shortest_paths(source, target, neighbors_for_person)
+    return itertools.islice(paths, limit)
 
-        frontier.add(start)
 
-    while True:
+def degrees_of_separation(source, target):
+    """
+    Returns the number of degrees of separation between two people,
+    or None if they are not connected.
 
-        # If there is no path
-        if frontier.empty():
+    With a landmark index, queries whose bounds meet are answered
+    without any search.
+    """
+    if landmark_index is not None:
+        bounds = landmark_index.bounds(source, target)
+        if bounds is None:
             return None
+        lower, upper = bounds
+        if lower == upper:
+            return lower
+
+    path = shortest_path(source, target)
+    return None if path is None else len(path)
+
+
+def distances_from(source):
+    """
+    Returns a dictionary mapping every person connected to the source
+    to their degrees of separation from the source, 0 for the source.
+    """
+    global distance_graph
+    if graph is not None:
+        return graph.distances_from(source)
+
+    # The BFS runs over CSR arrays, built once from the dictionaries
+    if distance_graph is None:
+        distance_graph = CompactGraph.from_dicts(people, movies)
+    return distance_graph.distances_from(source)
+
+
+def distance_histogram(distances):
+    """
+    Returns a dictionary mapping each degree of separation
+    to the number of people at that degree, in increasing order.
+    """
+    histogram = {}
+    for distance in sorted(distances.values()):
+        histogram[distance] = histogram.get(distance, 0) + 1
+    return histogram
+
+
+def batch_queries(lines, processes=None):
+    """
+    Answers lines of tab-separated (source, target) names or IDs
+    across a pool of processes, yielding one JSON line per query in order.
+
+    Workers are forked after the data is loaded, so they share the loaded
+    graph with this process instead of loading or receiving their own copy.
+    """
+    queries = (line.rstrip("\n").split("\t") for line in lines if line.strip())
+    if "fork" not in multiprocessing.get_all_start_methods():
+        for query in queries:
+            yield answer_query(query)
+        return
+
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes) as pool:
+        for answer in pool.imap(answer_query, queries, chunksize=64):
+            yield answer
+
+
+def answer_query(query):
+    """
+    Answers a single (source, target) query as a JSON line.
+    """
+    answer = {"query": query}
+    if len(query) != 2:
+        answer["error"] = "expected a source and a target"
+        return json.dumps(answer)
+
+    source, target = (resolve_person(person) for person in query)
+    if source is None or target is None:
+        answer["error"] = "person not found or ambiguous"
+        return json.dumps(answer)
 
-        # Get a node from the fontier to be analyzed
-        node = frontier.remove()
+    path = shortest_path(source, target)
+    answer["source"] = source
+    answer["target"] = target
+    answer["degrees"] = None if path is None else len(path)
+    answer["path"] = path
+    return json.dumps(answer)
 
-        explored.add(node.state)
 
-        for neighbor in neighbors_for_person(node.state[1]):
-            if not frontier.contains_state(neighbor) and neighbor not in explored:
-                child = Node(state=neighbor, parent=node, action=None)
+def resolve_person(person):
+    """
+    Returns the IMDB id for a person's id or unambiguous name,
+    or None, without ever asking on stdin.
+    """
+    if is_person_id(person):
+        return person
+    person_ids = names.get(person.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    return None
+
 
-                # If a path is found, add all the nodes to the variable path starting at the end (target -> source)
-                if target in child.state[1]:
-                    node = child
-                    while node.parent is not None:
-                        path.append([node.state[0], node.state[1]])
-                        node = node.parent
-                    path.append([node.state[0], node.state[1]])
+def is_person_id(person_id):
+    """
+    Returns True if a person id exists in whichever store is loaded.
+    """
+    if graph is not None:
+        return person_id in graph.person_index
+    return person_id in people
 
-                    # Put back path in the right order (source -> target)
-                    path.reverse()
-                    return path
 
-                frontier.add(child)
+def person_candidates(query, limit=10):
+    """
+    Returns up to `limit` people matching a name, a name prefix or a name
+    with typos, best matches first, without ever asking on stdin.
+    Each candidate is a dictionary of id, name, birth, movies and match.
+    The name index is built on the first call, unless built beforehand.
+    """
+    if name_index is None:
+        build_name_index()
+    return name_index.lookup(query, limit)
 
 
 def person_id_for_name(name):
@@ -154,9 +375,8 @@ def person_id_for_name(name):
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            name = person_name(person_id)
+            birth = person_birth(person_id)
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -174,13 +394,52 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
+
+    if neighbor_cache is not None:
+        neighbors = neighbor_cache.get(person_id)
+        if neighbors is not None:
+            return neighbors
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+        for star_id in movies[movie_id]["stars"]:
+            neighbors.add((movie_id, star_id))
+
+    if neighbor_cache is not None:
+        neighbors = frozenset(neighbors)
+        neighbor_cache.put(person_id, neighbors)
     return neighbors
 
 
+def person_name(person_id):
+    """
+    Returns the name of a person, from whichever store is loaded.
+    """
+    if graph is not None:
+        return graph.names[graph.person_index[person_id]]
+    return people[person_id]["name"]
+
+
+def person_birth(person_id):
+    """
+    Returns the birth year of a person, from whichever store is loaded.
+    """
+    if graph is not None:
+        return graph.births[graph.person_index[person_id]]
+    return people[person_id]["birth"]
+
+
+def movie_title(movie_id):
+    """
+    Returns the title of a movie, from whichever store is loaded.
+    """
+    if graph is not None:
+        return graph.titles[graph.movie_index[movie_id]]
+    return movies[movie_id]["title"]
+
+
 if __name__ == "__main__":
     main()
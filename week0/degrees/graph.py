@@ -0,0 +1,537 @@
+import csv
+import json
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+
+from util import all_shortest_paths, bidirectional_search
+
+# Graph whose people and movies are interned, shared with forked parsers
+_ingesting = None
+
+# Snapshot file written next to the CSV files
+SNAPSHOT = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGSNAP1"
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_people"]
+STRINGS = ["person_ids", "names", "births",
+           "movie_ids", "titles", "years"]
+
+
+class CompactGraph():
+    """
+    Compact store of the people <-> movies bipartite graph.
+
+    Person and movie IDs are interned to dense integers, and the adjacency
+    of both sides is kept as CSR arrays: the movies of person p are
+    person_movies[person_offsets[p]:person_offsets[p + 1]], and the stars
+    of movie m are movie_people[movie_offsets[m]:movie_offsets[m + 1]].
+    """
+
+    def __init__(self):
+
+        # Interned people: index <-> IMDB id, with name and birth by index
+        self.person_ids = []
+        self.person_index = {}
+        self.names = []
+        self.births = []
+
+        # Interned movies: index <-> IMDB id, with title and year by index
+        self.movie_ids = []
+        self.movie_index = {}
+        self.titles = []
+        self.years = []
+
+        # Optional cache of expanded neighbors, a util.NeighborCache
+        self.neighbor_cache = None
+
+        # Rows, seconds and rows per second of each file ingested
+        self.ingest_stats = {}
+
+        # CSR adjacency of both sides of the graph
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("i", [0])
+        self.movie_people = array("i")
+
+    @classmethod
+    def from_csv(cls, directory, processes=1):
+        """
+        Load people.csv, movies.csv and stars.csv from a directory.
+
+        With more than one process, stars.csv is split into byte ranges
+        parsed in parallel. Rows per second of each file are recorded
+        in ingest_stats.
+        """
+        graph = cls()
+
+        # Load people, skipping blank or malformed rows as for stars
+        start = time.perf_counter()
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            for row in reader:
+                if len(row) != 3:
+                    continue
+                person_id, name, birth = row
+                graph.add_person(person_id, name, birth)
+        graph.record("people.csv", len(graph.person_ids), start)
+
+        # Load movies
+        start = time.perf_counter()
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            for row in reader:
+                if len(row) != 3:
+                    continue
+                movie_id, title, year = row
+                graph.add_movie(movie_id, title, year)
+        graph.record("movies.csv", len(graph.movie_ids), start)
+
+        # Load stars, skipping rows about unknown people or movies
+        start = time.perf_counter()
+        path = f"{directory}/stars.csv"
+        parallel = "fork" in multiprocessing.get_all_start_methods()
+        if processes == 1 or not parallel:
+            stars_people, stars_movies, rows = _parse_stars(graph, path,
+                                                            0, None)
+        else:
+            stars_people, stars_movies, rows = _parse_stars_parallel(
+                graph, path, processes)
+        graph.record("stars.csv", rows, start)
+
+        graph.build(stars_people, stars_movies)
+        return graph
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Build the graph of the people and movies dictionaries of degrees.
+        """
+        graph = cls()
+        for person_id, person in people.items():
+            graph.add_person(person_id, person["name"], person["birth"])
+        for movie_id, movie in movies.items():
+            graph.add_movie(movie_id, movie["title"], movie["year"])
+
+        stars_people = array("i")
+        stars_movies = array("i")
+        for person_id, person in people.items():
+            for movie_id in person["movies"]:
+                stars_people.append(graph.person_index[person_id])
+                stars_movies.append(graph.movie_index[movie_id])
+        graph.build(stars_people, stars_movies)
+        return graph
+
+    def record(self, name, rows, start):
+        """
+        Records the ingestion rate of a file since start.
+        """
+        seconds = time.perf_counter() - start
+        self.ingest_stats[name] = {
+            "rows": rows,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds else None
+        }
+
+    @classmethod
+    def load(cls, path, sources=None):
+        """
+        Load a snapshot written by save, memory-mapping its arrays.
+        Raises ValueError if the snapshot was not written from `sources`,
+        or if it is truncated or corrupted.
+        """
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header, base = _read_header(data)
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("snapshot written on another architecture")
+        if sources is not None and header["sources"] != sources:
+            raise ValueError("snapshot is out of date")
+
+        # Every section must lie in the file, arrays of whole integers
+        itemsize = array("i").itemsize
+        for name in ARRAYS + STRINGS:
+            start, length = header["sections"][name]
+            if start < 0 or length < 0 or base + start + length > len(data):
+                raise ValueError(f"truncated snapshot section {name}")
+            if name in ARRAYS and length % itemsize:
+                raise ValueError(f"corrupted snapshot section {name}")
+
+        graph = cls()
+        graph.snapshot = data
+        for name in ARRAYS:
+            start, length = header["sections"][name]
+            view = memoryview(data)[base + start:base + start + length]
+            setattr(graph, name, view.cast("i"))
+        for name in STRINGS:
+            start, length = header["sections"][name]
+            strings = data[base + start:base + start + length].decode("utf-8")
+            setattr(graph, name, strings.split("\0") if strings else [])
+
+        if (len(graph.person_offsets) != len(graph.person_ids) + 1
+                or len(graph.movie_offsets) != len(graph.movie_ids) + 1
+                or graph.person_offsets[-1] != len(graph.person_movies)
+                or graph.movie_offsets[-1] != len(graph.movie_people)):
+            raise ValueError("corrupted snapshot")
+
+        graph.person_index = {
+            person_id: i for i, person_id in enumerate(graph.person_ids)}
+        graph.movie_index = {
+            movie_id: i for i, movie_id in enumerate(graph.movie_ids)}
+        return graph
+
+    def save(self, path, sources=None):
+        """
+        Write the graph to a binary snapshot file. `sources` is recorded
+        in the header so that stale snapshots can be detected.
+        """
+        sections = {}
+        blobs = []
+        offset = 0
+        for name in ARRAYS + STRINGS:
+            if name in ARRAYS:
+                blob = array("i", getattr(self, name)).tobytes()
+            else:
+                blob = "\0".join(getattr(self, name)).encode("utf-8")
+
+            # Keep every section aligned for the integer arrays
+            padding = -offset % 8
+            blobs.append(b"\0" * padding + blob)
+            sections[name] = (offset + padding, len(blob))
+            offset += padding + len(blob)
+
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "sources": sources,
+            "sections": sections
+        }).encode("utf-8")
+        header += b" " * (-(len(SNAPSHOT_MAGIC) + 8 + len(header)) % 8)
+
+        # Write to a temporary file, concurrent readers never see half a file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                f.write(SNAPSHOT_MAGIC)
+                f.write(len(header).to_bytes(8, "little"))
+                f.write(header)
+                for blob in blobs:
+                    f.write(blob)
+            os.replace(temporary, path)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+
+    def add_person(self, person_id, name, birth):
+        self.person_index[person_id] = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.names.append(name)
+        self.births.append(birth)
+
+    def add_movie(self, movie_id, title, year):
+        self.movie_index[movie_id] = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.titles.append(title)
+        self.years.append(year)
+
+    def build(self, stars_people, stars_movies):
+        """
+        Build both CSR sides from parallel arrays of (person, movie) indexes.
+        Duplicated pairs are dropped.
+        """
+        offsets, movies = _group(stars_people, stars_movies,
+                                 len(self.person_ids))
+
+        # Deduplicate the movies of every person, keeping them sorted
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        for person in range(len(self.person_ids)):
+            row = movies[offsets[person]:offsets[person + 1]]
+            self.person_movies.extend(sorted(set(row)))
+            self.person_offsets.append(len(self.person_movies))
+
+        # The movie side is the transpose of the deduplicated person side
+        people = array("i")
+        for person in range(len(self.person_ids)):
+            count = self.person_offsets[person + 1] - self.person_offsets[person]
+            people.extend([person] * count)
+        self.movie_offsets, self.movie_people = _group(
+            self.person_movies, people, len(self.movie_ids))
+
+    def movies_for(self, person):
+        """
+        Returns the movie indexes a person index starred in.
+        """
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_for(self, movie):
+        """
+        Returns the person indexes who starred in a movie index.
+        """
+        return self.movie_people[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people
+        who starred with a given person index.
+        """
+        if self.neighbor_cache is not None:
+            neighbors = self.neighbor_cache.get(person)
+            if neighbors is not None:
+                return neighbors
+
+        neighbors = tuple((movie, star)
+                          for movie in self.movies_for(person)
+                          for star in self.stars_for(movie))
+        if self.neighbor_cache is not None:
+            self.neighbor_cache.put(person, neighbors)
+        return neighbors
+
+    def distances(self, source):
+        """
+        Returns the degrees of separation from a person index to every
+        person index, -1 for people who are not connected, as a NumPy array.
+
+        The BFS is level-synchronous over the bipartite graph: a whole layer
+        of people is expanded through the movies they starred in, and every
+        movie is expanded once for the whole search. Each layer is gathered
+        from the CSR arrays with NumPy, without a loop over its people.
+        NumPy is only needed by this method.
+        """
+        import numpy as np
+
+        person_offsets = np.frombuffer(self.person_offsets, dtype=np.intc)
+        person_movies = np.frombuffer(self.person_movies, dtype=np.intc)
+        movie_offsets = np.frombuffer(self.movie_offsets, dtype=np.intc)
+        movie_people = np.frombuffer(self.movie_people, dtype=np.intc)
+
+        distances = np.full(len(self.person_ids), -1, dtype=np.intc)
+        expanded = np.zeros(len(self.movie_ids), dtype=bool)
+        distances[source] = 0
+
+        layer = np.array([source], dtype=np.intc)
+        depth = 0
+        while layer.size:
+            depth += 1
+
+            # Movies of the layer not expanded yet
+            movies = np.unique(_gather(person_offsets, person_movies, layer))
+            movies = movies[~expanded[movies]]
+            expanded[movies] = True
+
+            # Their stars not reached yet form the next layer
+            stars = np.unique(_gather(movie_offsets, movie_people, movies))
+            layer = stars[distances[stars] < 0]
+            distances[layer] = depth
+
+        return distances
+
+    def distances_from(self, person_id):
+        """
+        Returns a dictionary mapping every person_id connected to a person
+        to their degrees of separation, 0 for the person.
+        """
+        distances = self.distances(self.person_index[person_id])
+        reached = (distances >= 0).nonzero()[0]
+        return dict(zip([self.person_ids[person] for person in reached],
+                        distances[reached].tolist()))
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        return set(
+            (self.movie_ids[movie], self.person_ids[star])
+            for movie, star in self.neighbors(self.person_index[person_id])
+        )
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        path = bidirectional_search(self.person_index[source],
+                                    self.person_index[target],
+                                    self.neighbors)
+        if path is None:
+            return None
+        return [(self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path]
+
+    def all_shortest_paths(self, source, target):
+        """
+        Lazily yields every shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+        """
+        for path in all_shortest_paths(self.person_index[source],
+                                       self.person_index[target],
+                                       self.neighbors):
+            yield [(self.movie_ids[movie], self.person_ids[person])
+                   for movie, person in path]
+
+
+def load_cached(directory, processes=1):
+    """
+    Load the graph of a directory from its snapshot if the snapshot is
+    up to date with the CSV files, else from the CSV files, writing
+    a new snapshot for the next start.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    sources = source_stats(directory)
+    try:
+        return CompactGraph.load(path, sources)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    graph = CompactGraph.from_csv(directory, processes)
+    try:
+        graph.save(path, sources)
+    except OSError:
+        # Read-only dataset, the next start will parse the CSV files again
+        pass
+    return graph
+
+
+def source_stats(directory):
+    """
+    Returns the modification time and size of every source CSV file.
+    """
+    stats = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        stats[name] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def _parse_stars(graph, path, start, end):
+    """
+    Parses the stars.csv rows starting in the byte range [start, end)
+    of a file, the header row excluded, into arrays of person and movie
+    indexes. Returns both arrays and the number of rows parsed.
+    """
+    people = array("i")
+    movies = array("i")
+    person_index = graph.person_index
+    movie_index = graph.movie_index
+
+    with open(path, "rb") as f:
+        f.seek(start)
+
+        # A range owns the rows starting in it, the header is skipped too
+        if start == 0:
+            f.readline()
+        else:
+            f.seek(start - 1)
+            f.readline()
+
+        rows = 0
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            fields = line.decode("utf-8").rstrip("\r\n").split(",")
+            if len(fields) != 2:
+                continue
+            rows += 1
+            person = person_index.get(fields[0].strip('"'))
+            movie = movie_index.get(fields[1].strip('"'))
+            if person is not None and movie is not None:
+                people.append(person)
+                movies.append(movie)
+
+    return people, movies, rows
+
+
+def _parse_stars_chunk(chunk):
+    return _parse_stars(_ingesting, *chunk)
+
+
+def _parse_stars_parallel(graph, path, processes=None):
+    """
+    Parses stars.csv in byte ranges across forked processes, which share
+    the interned people and movies of the graph, and merges the results.
+    """
+    global _ingesting
+    processes = processes or os.cpu_count()
+    size = os.path.getsize(path)
+    bounds = [size * i // (processes * 4) for i in range(processes * 4 + 1)]
+    chunks = [(path, start, end) for start, end in zip(bounds, bounds[1:])]
+
+    _ingesting = graph
+    try:
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            results = pool.map(_parse_stars_chunk, chunks)
+    finally:
+        _ingesting = None
+
+    people = array("i")
+    movies = array("i")
+    rows = 0
+    for chunk_people, chunk_movies, chunk_rows in results:
+        people.extend(chunk_people)
+        movies.extend(chunk_movies)
+        rows += chunk_rows
+    return people, movies, rows
+
+
+def _read_header(data):
+    """
+    Parses the header at the start of snapshot bytes.
+    Returns the header and the offset where its sections start.
+    """
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError("not a degrees snapshot")
+    start = len(SNAPSHOT_MAGIC) + 8
+    size = int.from_bytes(data[len(SNAPSHOT_MAGIC):start], "little")
+    if len(data) < start + size:
+        raise ValueError("truncated snapshot header")
+    return json.loads(data[start:start + size]), start + size
+
+
+def _gather(offsets, values, rows):
+    """
+    Returns the concatenated CSR rows of values, for an array of rows.
+    """
+    import numpy as np
+
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    if not counts.size:
+        return values[:0]
+
+    # Position of every item: its row start, plus its rank within the row
+    ends = np.cumsum(counts)
+    positions = np.arange(ends[-1]) + np.repeat(starts - ends + counts, counts)
+    return values[positions]
+
+
+def _group(keys, values, size):
+    """
+    Counting sort of values by key, returns CSR (offsets, values) arrays.
+    """
+    offsets = array("i", [0]) * (size + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    grouped = array("i", [0]) * len(values)
+    position = array("i", offsets)
+    for key, value in zip(keys, values):
+        grouped[position[key]] = value
+        position[key] += 1
+
+    return offsets, grouped
@@ -0,0 +1,226 @@
+import json
+import os
+from array import array
+
+from graph import source_stats
+from util import bidirectional_search
+
+# Index file written next to the CSV files
+LANDMARKS = "landmarks.index"
+LANDMARKS_MAGIC = b"DEGLAND1"
+
+# Distances are stored in one signed byte, -1 for people not connected
+UNREACHABLE = -1
+FARTHEST = 127
+
+# Number of landmarks used to prune the search of a single query
+ACTIVE_LANDMARKS = 4
+
+
+class LandmarkIndex():
+    """
+    Precomputed degrees of separation from K landmark people to everyone.
+
+    By the triangle inequality, for any landmark L:
+        |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+    which bounds every query, and prunes the search for the exact path.
+    """
+
+    def __init__(self, landmarks, person_ids, distances):
+        self.landmarks = landmarks
+        self.person_ids = person_ids
+        self.position = {
+            person_id: i for i, person_id in enumerate(person_ids)}
+
+        # Person-major: the distances of person_ids[i] to every landmark
+        # are distances[i * k:(i + 1) * k]
+        self.distances = distances
+
+    @classmethod
+    def build(cls, person_ids, degree, distances_from, k=16):
+        """
+        Picks the k people with the highest `degree(person_id)`
+        as landmarks and stores `distances_from(landmark)` for each.
+        """
+        landmarks = sorted(person_ids, key=degree, reverse=True)[:k]
+        k = len(landmarks)
+        distances = array("b", [UNREACHABLE]) * (k * len(person_ids))
+        for i, landmark in enumerate(landmarks):
+            reached = distances_from(landmark)
+            for position, person_id in enumerate(person_ids):
+                if person_id in reached:
+                    distances[position * k + i] = min(reached[person_id],
+                                                      FARTHEST)
+        return cls(landmarks, person_ids, distances)
+
+    @classmethod
+    def load(cls, path, sources=None):
+        """
+        Load an index written by save.
+        Raises ValueError if it was not written from `sources`,
+        or if it is truncated.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(LANDMARKS_MAGIC)) != LANDMARKS_MAGIC:
+                raise ValueError("not a landmark index")
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size))
+            if sources is not None and header["sources"] != sources:
+                raise ValueError("landmark index is out of date")
+
+            person_ids = f.read(header["person_ids"])
+            if len(person_ids) != header["person_ids"]:
+                raise ValueError("truncated landmark index")
+            person_ids = person_ids.decode("utf-8")
+            person_ids = person_ids.split("\0") if person_ids else []
+
+            size = len(header["landmarks"]) * len(person_ids)
+            distances = array("b", f.read(size))
+            if len(distances) != size:
+                raise ValueError("truncated landmark index")
+
+        return cls(header["landmarks"], person_ids, distances)
+
+    def save(self, path, sources=None):
+        """
+        Write the index to a binary file. `sources` is recorded
+        in the header so that stale indexes can be detected.
+        """
+        person_ids = "\0".join(self.person_ids).encode("utf-8")
+        header = json.dumps({
+            "sources": sources,
+            "landmarks": self.landmarks,
+            "person_ids": len(person_ids)
+        }).encode("utf-8")
+
+        # Write to a temporary file, concurrent readers never see half a file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                f.write(LANDMARKS_MAGIC)
+                f.write(len(header).to_bytes(8, "little"))
+                f.write(header)
+                f.write(person_ids)
+                f.write(self.distances.tobytes())
+            os.replace(temporary, path)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between two people. Returns None if some landmark proves
+        they are not connected.
+        """
+        return self.bounds_at(self.position[source], self.position[target])
+
+    def bounds_at(self, source, target):
+        """
+        Returns the bounds of bounds() between the people at two positions.
+        """
+        lower = 0
+        upper = None
+        for to_source, to_target in zip(self.row(source), self.row(target)):
+            if (to_source == UNREACHABLE) != (to_target == UNREACHABLE):
+                return None
+            if to_source == UNREACHABLE:
+                continue
+            lower = max(lower, abs(to_source - to_target))
+
+            # Capped distances don't give an upper bound
+            if FARTHEST in (to_source, to_target):
+                continue
+            if upper is None or to_source + to_target < upper:
+                upper = to_source + to_target
+        return lower, upper
+
+    def row(self, position):
+        """
+        Returns the distances of the person at a position to every landmark.
+        """
+        k = len(self.landmarks)
+        return self.distances[position * k:(position + 1) * k]
+
+    def search(self, source, target, neighbors, indexed=False):
+        """
+        Returns the shortest list of (action, state) pairs from source
+        to target, or None if they are not connected.
+
+        States are person_ids, or positions in person_ids if `indexed`,
+        such as the person indexes of a CompactGraph built from the same
+        person_ids.
+
+        Runs a bidirectional BFS which drops every person whose depth plus
+        landmark lower bound to the other end exceeds the landmark upper
+        bound: such a person can't be on a shortest path. On small-world
+        graphs few people are dropped, and the plain search is faster.
+        """
+        if indexed:
+            position = None
+            source_position, target_position = source, target
+        else:
+            position = self.position.__getitem__
+            source_position = position(source)
+            target_position = position(target)
+
+        bounds = self.bounds_at(source_position, target_position)
+        if bounds is None:
+            return None
+        upper = bounds[1]
+        if upper is None:
+            return bidirectional_search(source, target, neighbors)
+
+        # Only the landmarks separating source and target best are checked,
+        # the others rarely prune anything and cost a lookup per person
+        source_row = self.row(source_position)
+        target_row = self.row(target_position)
+        active = sorted(range(len(self.landmarks)),
+                        key=lambda i: abs(source_row[i] - target_row[i]),
+                        reverse=True)[:ACTIVE_LANDMARKS]
+        ends = ([(i, target_row[i]) for i in active],
+                [(i, source_row[i]) for i in active])
+
+        # Both ends are connected, so are all the people reached
+        # and every landmark is reachable from all or none of them.
+        # A person is dropped as soon as one landmark bound is too far
+        distances = self.distances
+        k = len(self.landmarks)
+
+        def keep(state, depth, forward):
+            base = (state if position is None else position(state)) * k
+            slack = upper - depth
+            for i, end in ends[0] if forward else ends[1]:
+                if abs(distances[base + i] - end) > slack:
+                    return False
+            return True
+
+        return bidirectional_search(source, target, neighbors, keep)
+
+
+def load_or_build(directory, person_ids, degree, distances_from, k=16):
+    """
+    Load the landmark index of a directory if it is up to date with the
+    CSV files and has k landmarks for these person_ids, in this order,
+    else build it and save it next to them.
+    """
+    path = os.path.join(directory, LANDMARKS)
+    sources = source_stats(directory)
+    try:
+        index = LandmarkIndex.load(path, sources)
+        if (len(index.landmarks) == min(k, len(person_ids))
+                and index.person_ids == list(person_ids)):
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = LandmarkIndex.build(person_ids, degree, distances_from, k)
+    try:
+        index.save(path, sources)
+    except OSError:
+        # Read-only dataset, the index will be built again next time
+        pass
+    return index
@@ -0,0 +1,205 @@
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Prefixes matching more names than this have their ranking cached
+SCAN_LIMIT = 256
+
+# Most prefixes whose ranking is cached, least recently used dropped first
+CACHED_PREFIXES = 1024
+
+# Most candidates returned by one lookup
+MAX_LIMIT = 100
+
+# Fuzzy candidates checked with an edit distance, by trigrams in common
+FUZZY_CANDIDATES = 32
+
+# Trigrams in more names than this are too common to find candidates
+COMMON_TRIGRAM = 2048
+
+
+class NameIndex():
+    """
+    Name lookup by exact name, by prefix and with typos, built once.
+
+    Prefixes are looked up by bisection in the sorted list of names,
+    typos through an index from trigrams to the names containing them.
+    Matches are ranked by number of movies, then birth year.
+    """
+
+    def __init__(self, people):
+        """
+        `people` is an iterable of (person_id, name, birth, movie_count).
+        """
+        by_name = {}
+        self.people = {}
+        for person_id, name, birth, movie_count in people:
+            self.people[person_id] = (name, birth, movie_count)
+            by_name.setdefault(normalize(name), []).append(person_id)
+
+        # Sorted names, with their people already ranked
+        self.names = sorted(by_name)
+        self.person_ids = [sorted(by_name[name], key=self.rank)
+                           for name in self.names]
+
+        # Maps each trigram to the positions of the names containing it
+        self.trigrams = {}
+        for position, name in enumerate(self.names):
+            for trigram in trigrams(name):
+                self.trigrams.setdefault(trigram, array("i")).append(position)
+
+        # Ranked people of the prefixes matching too many names
+        self.prefixes = OrderedDict()
+
+    def rank(self, person_id):
+        """
+        Sort key of a person: most movies first, then known birth years
+        before unknown ones, older first.
+        """
+        name, birth, movie_count = self.people[person_id]
+        return (-movie_count, not birth.isdigit(),
+                int(birth) if birth.isdigit() else 0, person_id)
+
+    def lookup(self, query, limit=10, typos=True):
+        """
+        Returns up to `limit` candidates for a query, as dictionaries of
+        id, name, birth, movies and match ("exact", "prefix" or "fuzzy").
+        Exact matches come first, then prefix matches. Only if there are
+        none, names within a few typos of the query are returned.
+        At most MAX_LIMIT candidates are returned, whatever the limit.
+        """
+        limit = min(limit, MAX_LIMIT)
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+
+        candidates = []
+        seen = set()
+
+        def extend(person_ids, match):
+            for person_id in person_ids:
+                if len(candidates) == limit:
+                    return
+                if person_id not in seen:
+                    seen.add(person_id)
+                    candidates.append(self.candidate(person_id, match))
+
+        position = bisect_left(self.names, query)
+        if position < len(self.names) and self.names[position] == query:
+            extend(self.person_ids[position], "exact")
+        extend(self.prefix(query, limit), "prefix")
+        if typos and not candidates:
+            extend(self.fuzzy(query, limit), "fuzzy")
+
+        return candidates
+
+    def candidate(self, person_id, match):
+        name, birth, movie_count = self.people[person_id]
+        return {
+            "id": person_id,
+            "name": name,
+            "birth": birth,
+            "movies": movie_count,
+            "match": match
+        }
+
+    def prefix(self, query, limit):
+        """
+        Returns up to `limit` ranked person ids whose name starts with query.
+        """
+        limit = min(limit, MAX_LIMIT)
+        start = bisect_left(self.names, query)
+        end = bisect_left(self.names, query + "\uffff", start)
+        if end - start <= SCAN_LIMIT:
+            person_ids = [person_id
+                          for position in range(start, end)
+                          for person_id in self.person_ids[position]]
+            return sorted(person_ids, key=self.rank)[:limit]
+
+        ranked = self.prefixes.get(query)
+        if ranked is None or len(ranked) < limit:
+            person_ids = [person_id
+                          for position in range(start, end)
+                          for person_id in self.person_ids[position]]
+            ranked = sorted(person_ids, key=self.rank)[:max(limit, 10)]
+            self.prefixes[query] = ranked
+            if len(self.prefixes) > CACHED_PREFIXES:
+                self.prefixes.popitem(last=False)
+        self.prefixes.move_to_end(query)
+        return ranked[:limit]
+
+    def fuzzy(self, query, limit):
+        """
+        Returns up to `limit` ranked person ids whose name, or name prefix,
+        is within a few edits of the query.
+        """
+        # Count trigrams in common through the rarest trigrams only,
+        # keeping at least a few of them
+        postings = sorted((self.trigrams.get(trigram, ())
+                           for trigram in trigrams(query)), key=len)
+        rare = sum(len(positions) <= COMMON_TRIGRAM for positions in postings)
+
+        counts = {}
+        for positions in postings[:max(rare, 3)]:
+            for position in positions:
+                counts[position] = counts.get(position, 0) + 1
+        best = sorted(counts, key=counts.get, reverse=True)
+        best = best[:FUZZY_CANDIDATES]
+
+        # One typo is allowed every four characters
+        allowed = max(1, len(query) // 4)
+        matches = []
+        for position in best:
+            name = self.names[position]
+            distance = min(edit_distance(query, name, allowed),
+                           edit_distance(query, name[:len(query)], allowed))
+            if distance <= allowed:
+                matches.extend((distance, self.rank(person_id), person_id)
+                               for person_id in self.person_ids[position])
+
+        matches.sort()
+        return [person_id for _, _, person_id in matches[:limit]]
+
+
+def normalize(name):
+    """
+    Returns the lookup form of a name: lowercase, single spaced.
+    """
+    return " ".join(name.lower().split())
+
+
+def trigrams(name):
+    """
+    Returns the set of 3 character substrings of a padded name.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, bound):
+    """
+    Returns the Levenshtein distance between two strings,
+    or bound + 1 as soon as it is known to exceed bound.
+    Only the diagonal band of width 2 * bound + 1 is computed.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if a == b:
+        return 0
+
+    far = bound + 1
+    previous = [j if j <= bound else far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        x = a[i - 1]
+        current = [far] * (len(b) + 1)
+        if i <= bound:
+            current[0] = i
+        for j in range(max(1, i - bound), min(len(b), i + bound) + 1):
+            current[j] = min(previous[j] + 1,
+                             current[j - 1] + 1,
+                             previous[j - 1] + (x != b[j - 1]),
+                             far)
+        if min(current) > bound:
+            return far
+        previous = current
+    return previous[-1]
@@ -0,0 +1,201 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+
+class LatencyHistogram():
+    """
+    Counts of query latencies in power of two buckets of milliseconds.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        milliseconds = seconds * 1000
+        bucket = 1
+        while bucket < milliseconds:
+            bucket *= 2
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total * 1000 / self.count if self.count else None,
+            "buckets_ms": {f"<={bucket}": self.buckets[bucket]
+                           for bucket in sorted(self.buckets)}
+        }
+
+
+class DegreesServer():
+    """
+    Line protocol server over the loaded degrees data.
+
+    Every request is one JSON object on a line, answered by one JSON line:
+        {"op": "path", "source": name or id, "target": name or id}
+        {"op": "names", "query": text, "limit": 10}
+        {"op": "stats"}
+        {"op": "cache"}
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+
+        # Futures of the searches running, by (source, target)
+        self.in_flight = {}
+        self.deduplicated = 0
+        self.histogram = LatencyHistogram()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                start = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    answer = await self.answer(request)
+                except (ValueError, TypeError, KeyError) as e:
+                    answer = json.dumps({"error": str(e)})
+                except Exception as e:
+                    # Any failure of a request or a worker is answered too
+                    answer = json.dumps({"error": f"{type(e).__name__}: {e}"})
+                self.histogram.add(time.perf_counter() - start)
+                writer.write(answer.encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def answer(self, request):
+        """
+        Returns the JSON line answering a request.
+        """
+        if not isinstance(request, dict):
+            raise ValueError("request must be a JSON object")
+        op = request["op"]
+        if op == "path":
+            source = string_field(request, "source")
+            target = string_field(request, "target")
+            return await self.path(source, target)
+        elif op == "names":
+            limit = request.get("limit", 10)
+            if not isinstance(limit, int):
+                raise ValueError("limit must be an integer")
+            candidates = degrees.person_candidates(
+                string_field(request, "query"), limit)
+            return json.dumps({"candidates": candidates})
+        elif op == "stats":
+            return json.dumps({
+                "latency": self.histogram.summary(),
+                "in_flight": len(self.in_flight),
+                "deduplicated": self.deduplicated
+            })
+        elif op == "cache":
+            return await self.cache_stats()
+        raise ValueError(f"unknown op {op}")
+
+    async def path(self, source, target):
+        """
+        Runs a search in the worker pool, sharing it with any identical
+        search already running.
+        """
+        key = (source, target)
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, degrees.answer_query,
+                                      [source, target])
+        self.in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            del self.in_flight[key]
+
+    async def cache_stats(self):
+        """
+        Returns the neighbor cache statistics of one worker, as a JSON line.
+        """
+        loop = asyncio.get_running_loop()
+        stats = await loop.run_in_executor(self.executor, _cache_stats)
+        return json.dumps({"neighbor_cache": stats})
+
+
+def string_field(request, name):
+    """
+    Returns a field of a request which must be a string.
+    """
+    value = request[name]
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string")
+    return value
+
+
+def _cache_stats():
+    if degrees.neighbor_cache is None:
+        return None
+    return degrees.neighbor_cache.stats()
+
+
+async def serve(host, port, processes):
+    # Workers are forked once the data is loaded and share it
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = None
+    with ProcessPoolExecutor(processes, mp_context=context) as executor:
+        server = DegreesServer(executor)
+        tcp = await asyncio.start_server(server.handle, host, port)
+        print(f"Serving on {host}:{port}", file=sys.stderr)
+        async with tcp:
+            await tcp.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="load data into the compact graph store")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--processes", type=int,
+                        help="number of worker processes")
+    parser.add_argument("--neighbor-cache", type=int, metavar="ENTRIES",
+                        help="cache up to ENTRIES neighbors in each worker")
+    args = parser.parse_args()
+
+    # Load data from files into memory, once for all the queries
+    print("Loading data...", file=sys.stderr)
+    if args.compact:
+        degrees.load_graph(args.directory)
+    else:
+        degrees.load_data(args.directory)
+    if args.neighbor_cache:
+        degrees.enable_neighbor_cache(args.neighbor_cache)
+
+    # Names are looked up in the event loop, their index is built first
+    degrees.build_name_index()
+    print("Data loaded.", file=sys.stderr)
+
+    asyncio.run(serve(args.host, args.port, args.processes))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+import heapq
+import itertools
+from collections import OrderedDict, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +41,270 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class HashStackFrontier():
+    """
+    Stack frontier with O(1) add, remove and contains_state, a drop-in
+    replacement for StackFrontier in searches written against it.
+    Nodes live in a deque, their states are counted in a dictionary.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.pop()
+            self.discard_state(node.state)
+            return node
+
+    def pop(self):
+        return self.frontier.pop()
+
+    def discard_state(self, state):
+        count = self.states[state] - 1
+        if count == 0:
+            del self.states[state]
+        else:
+            self.states[state] = count
+
+
+class HashQueueFrontier(HashStackFrontier):
+
+    def pop(self):
+        return self.frontier.popleft()
+
+
+class PriorityFrontier(HashStackFrontier):
+    """
+    Frontier removing the node with the lowest `priority(node)` first,
+    for weighted searches. Ties are broken in insertion order.
+    """
+
+    def __init__(self, priority):
+        super().__init__()
+        self.frontier = []
+        self.priority = priority
+        self.counter = itertools.count()
+
+    def add(self, node):
+        heapq.heappush(self.frontier,
+                       (self.priority(node), next(self.counter), node))
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def pop(self):
+        return heapq.heappop(self.frontier)[2]
+
+
+class NeighborCache():
+    """
+    Least recently used cache of expanded neighbor sets, bounded by the
+    total number of neighbors it holds rather than by the number of sets.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = 0
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, state):
+        """
+        Returns the cached neighbors of a state, or None.
+        """
+        neighbors = self.cache.get(state)
+        if neighbors is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.cache.move_to_end(state)
+        return neighbors
+
+    def put(self, state, neighbors):
+        """
+        Caches the neighbors of a state, evicting the least recently used
+        ones as needed. Sets larger than the whole cache are not kept.
+        """
+        if len(neighbors) > self.max_entries or state in self.cache:
+            return
+        self.cache[state] = neighbors
+        self.entries += len(neighbors)
+        while self.entries > self.max_entries:
+            _, evicted = self.cache.popitem(last=False)
+            self.entries -= len(evicted)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "states": len(self.cache),
+            "entries": self.entries,
+            "max_entries": self.max_entries
+        }
+
+
+def bidirectional_search(source, target, neighbors, keep=None):
+    """
+    Breadth-first search growing one frontier from the source and one from
+    the target, one whole layer at a time, until the two frontiers meet.
+
+    `neighbors(state)` returns (action, state) pairs and must be symmetric.
+    `keep(state, depth, forward)`, if given, can prune a state reached at
+    `depth` from the source (forward) or from the target; it must keep
+    every state lying on a shortest path.
+    Returns the shortest list of (action, state) pairs leading from source
+    to target, or None if the target cannot be reached.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached state to the (action, state) pair it was reached from
+    forward = {source: None}
+    backward = {target: None}
+
+    forward_layer = [source]
+    backward_layer = [target]
+    forward_depth = 0
+    backward_depth = 0
+
+    while forward_layer and backward_layer:
+
+        # Always expand the smaller side, the frontiers stay balanced
+        if len(forward_layer) <= len(backward_layer):
+            forward_depth += 1
+            forward_layer, meeting = _expand_layer(
+                forward_layer, forward, backward, neighbors,
+                _keep_at(keep, forward_depth, True))
+        else:
+            backward_depth += 1
+            backward_layer, meeting = _expand_layer(
+                backward_layer, backward, forward, neighbors,
+                _keep_at(keep, backward_depth, False))
+
+        if meeting is not None:
+            return _join_paths(meeting, forward, backward)
+
+    return None
+
+
+def _keep_at(keep, depth, forward):
+    """
+    Binds a keep callback to the depth and direction of a layer.
+    """
+    if keep is None:
+        return None
+    return lambda state: keep(state, depth, forward)
+
+
+def _expand_layer(layer, parents, others, neighbors, keep=None):
+    """
+    Expands a whole BFS layer, recording parents of newly reached states.
+    Returns the next layer and a state also reached by the other side, if any.
+    """
+    next_layer = []
+    for state in layer:
+        for action, neighbor in neighbors(state):
+            if neighbor in parents:
+                continue
+            if keep is not None and not keep(neighbor):
+                continue
+            parents[neighbor] = (action, state)
+            if neighbor in others:
+                return next_layer, neighbor
+            next_layer.append(neighbor)
+    return next_layer, None
+
+
+def _join_paths(meeting, forward, backward):
+    """
+    Builds the source -> target path going through the meeting state.
+    """
+    path = []
+
+    # Walk back to the source, then put that half in order
+    state = meeting
+    while forward[state] is not None:
+        action, parent = forward[state]
+        path.append((action, state))
+        state = parent
+    path.reverse()
+
+    # Walk forward to the target, the action links a state to its parent
+    state = meeting
+    while backward[state] is not None:
+        action, parent = backward[state]
+        path.append((action, parent))
+        state = parent
+
+    return path
+
+
+def all_shortest_paths(source, target, neighbors):
+    """
+    Lazily yields every distinct shortest list of (action, state) pairs
+    leading from source to target, yields nothing if it cannot be reached.
+
+    The BFS layers are kept once as a DAG of parents, and paths are
+    enumerated by backtracking from the target, so memory only grows
+    with the DAG and the path length, never with the number of paths.
+    """
+    if source == target:
+        yield []
+        return
+
+    # Maps each reached state to all the (action, state) pairs it was
+    # reached from at its BFS depth
+    parents = {source: []}
+    layer = [source]
+    while layer and target not in parents:
+        next_layer = []
+        reached = set()
+        for state in layer:
+            for action, neighbor in neighbors(state):
+                if neighbor in reached:
+                    parents[neighbor].append((action, state))
+                elif neighbor not in parents:
+                    parents[neighbor] = [(action, state)]
+                    reached.add(neighbor)
+                    next_layer.append(neighbor)
+        layer = next_layer
+
+    if target not in parents:
+        return
+
+    # Depth first over the DAG, one parent iterator per state of the path
+    states = [target]
+    choices = [iter(parents[target])]
+    steps = []
+    while choices:
+        choice = next(choices[-1], None)
+        if choice is None:
+            choices.pop()
+            states.pop()
+            if steps:
+                steps.pop()
+            continue
+
+        action, parent = choice
+        steps.append((action, states[-1]))
+        if parent == source:
+            yield steps[::-1]
+            steps.pop()
+        else:
+            states.append(parent)
+            choices.append(iter(parents[parent]))
@@ -0,0 +1,77 @@
+"""
+Batch evaluation of Tic Tac Toe positions
+"""
+
+import numpy as np
+
+import tictactoe as ttt
+
+# Cell values of boards in a batch
+X = 1
+O = -1
+EMPTY = 0
+
+
+def to_array(boards):
+    """
+    Returns an int8 array of shape (N, 3, 3) from a list of boards,
+    with 1 for X, -1 for O and 0 for EMPTY.
+    """
+    values = {ttt.X: X, ttt.O: O, ttt.EMPTY: EMPTY}
+    return np.array([[[values[cell] for cell in row] for row in board]
+                     for board in boards], dtype=np.int8).reshape(-1, 3, 3)
+
+
+def line_sums(boards):
+    """
+    Returns the sums of the 8 lines of each board, shape (N, 8):
+    3 rows, 3 columns, then both diagonals.
+    """
+    boards = boards.astype(np.int16)
+    return np.concatenate([
+        boards.sum(axis=2),
+        boards.sum(axis=1),
+        np.trace(boards, axis1=1, axis2=2)[:, None],
+        np.trace(boards[:, :, ::-1], axis1=1, axis2=2)[:, None]
+    ], axis=1)
+
+
+def evaluate(boards):
+    """
+    Evaluates N boards given as an int8 array of shape (N, 3, 3).
+
+    Returns a dictionary of arrays of shape (N,):
+        winner: 1 if X has won, -1 if O has won, 0 otherwise
+        terminal: True if the game is over
+        utility: 1 if X has won, -1 if O has won, 0 otherwise
+        player: 1 if X has the next turn, -1 if O has
+    """
+    boards = np.asarray(boards, dtype=np.int8).reshape(-1, 3, 3)
+    sums = line_sums(boards)
+
+    # Checks in the order of tictactoe.winner, for boards where both
+    # players have a line: any row of X, any row of O, then each column
+    # for X and O, then any diagonal of X, any diagonal of O
+    rows, columns, diagonals = sums[:, 0:3], sums[:, 3:6], sums[:, 6:8]
+    checks = [(rows == 3 * X).any(axis=1), (rows == 3 * O).any(axis=1)]
+    for i in range(3):
+        checks += [columns[:, i] == 3 * X, columns[:, i] == 3 * O]
+    checks += [(diagonals == 3 * X).any(axis=1),
+               (diagonals == 3 * O).any(axis=1)]
+    checks = np.stack(checks, axis=1)
+
+    # Even checks are about X, odd checks about O
+    first = checks.argmax(axis=1)
+    winner = np.where(checks.any(axis=1),
+                      np.where(first % 2 == 0, X, O), EMPTY).astype(np.int8)
+
+    full = (boards != EMPTY).all(axis=(1, 2))
+    count_x = (boards == X).sum(axis=(1, 2))
+    count_o = (boards == O).sum(axis=(1, 2))
+
+    return {
+        "winner": winner,
+        "terminal": (winner != EMPTY) | full,
+        "utility": winner.copy(),
+        "player": np.where(count_o < count_x, O, X).astype(np.int8)
+    }
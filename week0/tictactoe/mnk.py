@@ -0,0 +1,352 @@
+"""
+m,n,k game Player: k in a row on an m x n board
+"""
+
+import random
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Scores of the search, from the point of view of the player to move
+WIN = 1000000
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Directions of the lines going through a cell
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+
+class Timeout(Exception):
+    pass
+
+
+class Board():
+    """
+    m x n board where k in a row wins, updated in place by play/undo.
+    Only the lines through the last move are checked for a win, and a
+    Zobrist hash of the position is kept up to date for the search.
+    """
+
+    def __init__(self, m=3, n=3, k=3):
+        self.m = m
+        self.n = n
+        self.k = k
+        self.cells = [EMPTY] * (m * n)
+        self.moves = []
+        self.won = None
+
+        # Winner before each move, restored by undo
+        self.won_before = []
+
+        # Random key of every (cell, player), xored into the position hash
+        keys = random.Random(m * 1000003 + n * 1009 + k)
+        self.keys = {X: [keys.getrandbits(64) for _ in range(m * n)],
+                     O: [keys.getrandbits(64) for _ in range(m * n)]}
+        self.hash = 0
+
+        # Every window of k cells in a line, for the static evaluation
+        self.windows = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in DIRECTIONS:
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.windows.append([(i + di * step) * n + j + dj * step
+                                             for step in range(k)])
+
+    @classmethod
+    def from_rows(cls, rows, k=3):
+        """
+        Returns the board of a list of lists of X, O and EMPTY.
+        """
+        board = cls(len(rows), len(rows[0]), k)
+        for i, row in enumerate(rows):
+            for j, cell in enumerate(row):
+                if cell is not EMPTY:
+                    board.cells[i * board.n + j] = cell
+                    board.hash ^= board.keys[cell][i * board.n + j]
+                    board.moves.append(i * board.n + j)
+                    board.won_before.append(None)
+        for cell in board.moves:
+            if board.wins_through(cell):
+                board.won = board.cells[cell]
+        return board
+
+    def copy(self):
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.cells = self.cells.copy()
+        board.moves = self.moves.copy()
+        board.won_before = self.won_before.copy()
+        return board
+
+    def rows(self):
+        return [self.cells[i * self.n:(i + 1) * self.n] for i in range(self.m)]
+
+    def player(self):
+        return X if len(self.moves) % 2 == 0 else O
+
+    def terminal(self):
+        return self.won is not None or len(self.moves) == self.m * self.n
+
+    def actions(self):
+        if self.won is not None:
+            return set()
+        return set(divmod(cell, self.n)
+                   for cell, player in enumerate(self.cells)
+                   if player is EMPTY)
+
+    def play(self, cell):
+        """
+        Plays the player to move on a cell index.
+        """
+        if self.cells[cell] is not EMPTY:
+            raise NameError('This cell has already been played !')
+        player = self.player()
+        self.cells[cell] = player
+        self.hash ^= self.keys[player][cell]
+        self.moves.append(cell)
+        self.won_before.append(self.won)
+        if self.won is None and self.wins_through(cell):
+            self.won = player
+
+    def undo(self):
+        """
+        Takes back the last move.
+        """
+        cell = self.moves.pop()
+        player = self.cells[cell]
+        self.cells[cell] = EMPTY
+        self.hash ^= self.keys[player][cell]
+        self.won = self.won_before.pop()
+
+    def wins_through(self, cell):
+        """
+        Returns True if the stone on a cell is part of k in a row.
+        """
+        player = self.cells[cell]
+        i, j = divmod(cell, self.n)
+        for di, dj in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                a, b = i + sign * di, j + sign * dj
+                while (0 <= a < self.m and 0 <= b < self.n
+                       and self.cells[a * self.n + b] == player):
+                    count += 1
+                    a, b = a + sign * di, b + sign * dj
+            if count >= self.k:
+                return True
+        return False
+
+
+def initial_state(m=3, n=3, k=3):
+    """
+    Returns starting state of an m x n board where k in a row wins.
+    """
+    return Board(m, n, k)
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    return board.player()
+
+
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    return board.actions()
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    copied_board = board.copy()
+    copied_board.play(action[0] * board.n + action[1])
+    return copied_board
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    return board.won
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return board.terminal()
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    if board.won == X:
+        return 1
+    elif board.won == O:
+        return -1
+    return 0
+
+
+def minimax(board, budget=1.0):
+    """
+    Returns the best action found for the current player on the board
+    within `budget` seconds, by iterative deepening alpha-beta search.
+    """
+    if board.terminal():
+        return None
+
+    board = board.copy()
+    search = Search(board, time.perf_counter() + budget)
+    best_cell = search.candidates(None)[0]
+    for depth in range(1, board.m * board.n - len(board.moves) + 1):
+        try:
+            value, cell = search.root(depth)
+        except Timeout:
+            break
+        best_cell = cell
+        if abs(value) >= WIN - board.m * board.n:
+            break
+    return divmod(best_cell, board.n)
+
+
+class Search():
+    """
+    Alpha-beta negamax with a transposition table, over a Board
+    updated in place, stopped by a wall-clock deadline.
+    """
+
+    def __init__(self, board, deadline):
+        self.board = board
+        self.deadline = deadline
+        self.nodes = 0
+
+        # Position hash -> (depth, value, bound, best cell)
+        self.table = {}
+
+    def root(self, depth):
+        """
+        Searches the position to a depth, returns its value and best cell.
+        """
+        value = self.negamax(depth, -WIN - 1, WIN + 1, 0)
+        return value, self.table[self.board.hash][3]
+
+    def negamax(self, depth, alpha, beta, ply):
+        board = self.board
+        if board.won is not None:
+            return -(WIN - ply)
+        if len(board.moves) == board.m * board.n:
+            return 0
+
+        # Leaves are counted too, evaluating them is the costly part
+        self.nodes += 1
+        if self.nodes % 64 == 0 and time.perf_counter() > self.deadline:
+            raise Timeout
+        if depth == 0:
+            return self.evaluate()
+
+        entry = self.table.get(board.hash)
+        hint = None
+        if entry is not None:
+            entry_depth, value, bound, hint = entry
+            if entry_depth >= depth:
+                if bound == EXACT:
+                    return value
+                elif bound == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        original_alpha = alpha
+        best = -WIN - 1
+        best_cell = None
+        for cell in self.candidates(hint):
+            board.play(cell)
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.undo()
+            if score > best:
+                best = score
+                best_cell = cell
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+
+        if best <= original_alpha:
+            bound = UPPER
+        elif best >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table[board.hash] = (depth, best, bound, best_cell)
+        return best
+
+    def candidates(self, hint):
+        """
+        Returns the cells worth playing, best first: the best cell of the
+        previous search of this position, then cells next to many stones,
+        then cells near the center. On large boards, only cells next to
+        a stone are considered.
+        """
+        board = self.board
+        m, n = board.m, board.n
+        if not board.moves:
+            return [(m // 2) * n + n // 2]
+
+        scores = {}
+        for cell, player in enumerate(board.cells):
+            if player is EMPTY:
+                continue
+            i, j = divmod(cell, n)
+            for a in range(max(0, i - 1), min(m, i + 2)):
+                for b in range(max(0, j - 1), min(n, j + 2)):
+                    if board.cells[a * n + b] is EMPTY:
+                        scores[a * n + b] = scores.get(a * n + b, 0) + 1
+
+        if m * n <= 25:
+            for cell, player in enumerate(board.cells):
+                if player is EMPTY:
+                    scores.setdefault(cell, 0)
+
+        def order(cell):
+            i, j = divmod(cell, n)
+            return (cell != hint, -scores[cell],
+                    abs(2 * i - m + 1) + abs(2 * j - n + 1))
+
+        return sorted(scores, key=order)
+
+    def evaluate(self):
+        """
+        Returns a static score for the player to move: windows of k cells
+        holding stones of a single player count 4 ** stones for them.
+        """
+        board = self.board
+        me = board.player()
+        score = 0
+        for window in board.windows:
+            mine = 0
+            theirs = 0
+            for cell in window:
+                player = board.cells[cell]
+                if player is EMPTY:
+                    continue
+                if player == me:
+                    mine += 1
+                else:
+                    theirs += 1
+            if mine and not theirs:
+                score += 4 ** mine
+            elif theirs and not mine:
+                score -= 4 ** theirs
+        return score
@@ -1,6 +1,8 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
@@ -13,13 +15,21 @@ white = (255, 255, 255)
 
 screen = pygame.display.set_mode(size)
 
+smallFont = pygame.font.Font("OpenSans-Regular.ttf", 20)
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# AI search runs in the background, the window keeps responding meanwhile.
+# A reset sets the search's event, which stops it within a few positions
+ai_executor = ThreadPoolExecutor(max_workers=1)
+ai_search = None
+ai_cancelled = None
+ai_started = None
+ai_time = None
 
 while True:
 
@@ -101,6 +111,9 @@ while True:
                 title = f"Game Over: {winner} wins."
         elif user == player:
             title = f"Play as {user}"
+        elif ai_search is not None:
+            thinking = time.perf_counter() - ai_started
+            title = f"Computer thinking... {thinking:.1f}s"
         else:
             title = f"Computer thinking..."
         title = largeFont.render(title, True, white)
@@ -108,15 +121,26 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Show how long the last AI search took
+        if ai_time is not None:
+            searched = smallFont.render(f"AI: {ai_time * 1000:.0f} ms",
+                                        True, white)
+            searchedRect = searched.get_rect()
+            searchedRect.center = ((width / 8), (height / 2))
+            screen.blit(searched, searchedRect)
+
+        # Check for AI move, started in the background and played when done
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if ai_search is None:
+                ai_started = time.perf_counter()
+                ai_cancelled = threading.Event()
+                ai_search = ai_executor.submit(ttt.minimax, board,
+                                               cancelled=ai_cancelled)
+            elif ai_search.done():
+                move = ai_search.result()
+                ai_time = time.perf_counter() - ai_started
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+                ai_search = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -127,20 +151,29 @@ while True:
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+        # Play again once the game is over, or reset it at any time
+        againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+        again = mediumFont.render("Play Again" if game_over else "Reset",
+                                  True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        click, _, _ = pygame.mouse.get_pressed()
+        if click == 1:
+            mouse = pygame.mouse.get_pos()
+            if againButton.collidepoint(mouse):
+                time.sleep(0.2)
+
+                # A search still pending is cancelled, a running one
+                # stops at its next position and its result is dropped
+                if ai_search is not None:
+                    ai_search.cancel()
+                    ai_cancelled.set()
+                ai_search = None
+                ai_cancelled = None
+                ai_time = None
+                user = None
+                board = ttt.initial_state()
 
     pygame.display.flip()
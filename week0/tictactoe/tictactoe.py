@@ -4,11 +4,80 @@ Tic Tac Toe Player
 
 import math
 import copy
+import os
+import sys
+from array import array
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Search used by minimax: "bitboard" (alpha-beta) or "tree" (full game tree)
+ENGINE = "bitboard"
+
+# Bitboards: cell (i, j) is bit 3 * i + j of a 9-bit mask per player
+FULL = 0b111111111
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100                # diagonals
+]
+
+# Center first, then corners, then edges: best moves are tried first
+MOVE_ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+
+class Cancelled(Exception):
+    pass
+
+
+def _symmetry_tables():
+    """
+    Returns, for each of the 8 symmetries of the board, a table mapping
+    every 9-bit mask to its transformed mask.
+    """
+    def rotate(i, j):
+        return j, 2 - i
+
+    def mirror(i, j):
+        return i, 2 - j
+
+    permutations = []
+    for mirrored in (False, True):
+        for rotations in range(4):
+            permutation = []
+            for cell in range(9):
+                i, j = divmod(cell, 3)
+                if mirrored:
+                    i, j = mirror(i, j)
+                for _ in range(rotations):
+                    i, j = rotate(i, j)
+                permutation.append(3 * i + j)
+            permutations.append(permutation)
+
+    tables = []
+    for permutation in permutations:
+        table = []
+        for mask in range(FULL + 1):
+            transformed = 0
+            for cell in range(9):
+                if mask & (1 << cell):
+                    transformed |= 1 << permutation[cell]
+            table.append(transformed)
+        tables.append(table)
+    return tables
+
+
+SYMMETRIES = _symmetry_tables()
+
+# Transposition table: canonical position -> (value, bound)
+EXACT, LOWER, UPPER = 0, 1, 2
+transpositions = {}
+
+# Opening book: X bitboard | O bitboard << 9 -> (best cell, value for X)
+BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+book = None
+
 def initial_state():
     """
     Returns starting state of the board.
@@ -124,9 +193,28 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def minimax(board, engine=None, cancelled=None):
     """
     Returns the optimal action for the current player on the board.
+    Positions in the opening book are looked up unless an engine is given.
+    `cancelled` is an optional threading.Event: once it is set, the
+    search stops by raising Cancelled.
+    """
+    if book is not None and engine is None:
+        x, o = to_bitboards(board)
+        entry = book.get(x | o << 9)
+        if entry is not None:
+            return divmod(entry[0], 3)
+
+    if (engine or ENGINE) == "bitboard":
+        return bitboard_minimax(board, cancelled)
+    return tree_minimax(board, cancelled)
+
+
+def tree_minimax(board, cancelled=None):
+    """
+    Returns the optimal action for the current player on the board,
+    searching the full game tree.
     """
     if terminal(board):
         return None
@@ -137,7 +225,7 @@ def minimax(board):
         for action in possible_actions:
             # move to be analyzed
             move = result(board, action)
-            score = get_min(move)
+            score = get_min(move, cancelled)
             # if X winner, return that move
             if score == 1:
                 return (action[0], action[1])
@@ -149,7 +237,7 @@ def minimax(board):
         minValue = 200
         for action in possible_actions:
             move = result(board, action)
-            score = get_max(move)
+            score = get_max(move, cancelled)
             # if O winner, return that move
             if score == -1:
                 return (action[0], action[1])
@@ -163,7 +251,9 @@ def minimax(board):
 # recursively get the minimized score
 
 
-def get_min(board):
+def get_min(board, cancelled=None):
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled
     if terminal(board):
         return utility(board)
 
@@ -171,13 +261,15 @@ def get_min(board):
     minValue = 100
 
     for action in possible_actions:
-        minValue = min(minValue, get_max(result(board, action)))
+        minValue = min(minValue, get_max(result(board, action), cancelled))
     return minValue
 
 # recursively get the maximized score
 
 
-def get_max(board):
+def get_max(board, cancelled=None):
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled
     if terminal(board):
         return utility(board)
 
@@ -185,6 +277,202 @@ def get_max(board):
     maxValue = -100
 
     for action in possible_actions:
-        maxValue = max(maxValue, get_min(result(board, action)))
+        maxValue = max(maxValue, get_min(result(board, action), cancelled))
     return maxValue
 
+
+def to_bitboards(board):
+    """
+    Returns the (X, O) bitboards of a board.
+    """
+    x = 0
+    o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def bitboard_minimax(board, cancelled=None):
+    """
+    Returns the optimal action for the current player on the board,
+    with an alpha-beta search over bitboards.
+    """
+    x, o = to_bitboards(board)
+    if _wins(x) or _wins(o) or (x | o) == FULL:
+        return None
+
+    # Count the pieces on the bitboards, as player() does on the board
+    if bin(o).count("1") < bin(x).count("1"):
+        me, opponent = o, x
+    else:
+        me, opponent = x, o
+
+    best_move = None
+    best = -2
+    for cell in MOVE_ORDER:
+        bit = 1 << cell
+        if (me | opponent) & bit:
+            continue
+        score = -_negamax(opponent, me | bit, -2, -best, cancelled)
+        if score > best:
+            best = score
+            best_move = divmod(cell, 3)
+            if best == 1:
+                break
+    return best_move
+
+
+def _wins(mask):
+    """
+    Returns True if a bitboard holds a full line.
+    """
+    for line in LINES:
+        if mask & line == line:
+            return True
+    return False
+
+
+def _canonical(me, opponent):
+    """
+    Returns the key shared by a position and its 8 symmetric positions.
+    """
+    return min((table[me] << 9) | table[opponent] for table in SYMMETRIES)
+
+
+def _negamax(me, opponent, alpha, beta, cancelled=None):
+    """
+    Returns the value of a position for the player to move, `me`:
+    1 for a win, 0 for a tie, -1 for a loss.
+    """
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled
+    if _wins(opponent):
+        return -1
+    if (me | opponent) == FULL:
+        return 0
+
+    key = _canonical(me, opponent)
+    entry = transpositions.get(key)
+    if entry is not None:
+        value, bound = entry
+        if bound == EXACT:
+            return value
+        elif bound == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value
+
+    original_alpha = alpha
+    best = -2
+    for cell in MOVE_ORDER:
+        bit = 1 << cell
+        if (me | opponent) & bit:
+            continue
+        score = -_negamax(opponent, me | bit, -beta, -alpha, cancelled)
+        if score > best:
+            best = score
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+    if best <= original_alpha:
+        transpositions[key] = (best, UPPER)
+    elif best >= beta:
+        transpositions[key] = (best, LOWER)
+    else:
+        transpositions[key] = (best, EXACT)
+    return best
+
+
+def build_book(path=BOOK):
+    """
+    Solves every reachable non-terminal position and writes its best move
+    and value to a book file, one 32-bit little-endian record per position:
+    X bitboard (bits 0-8), O bitboard (9-17), cell (18-21), value + 1 (22-23).
+    """
+    records = array("I")
+    seen = set()
+    positions = [(0, 0)]
+    while positions:
+        x, o = positions.pop()
+        if (x, o) in seen or _wins(x) or _wins(o) or (x | o) == FULL:
+            continue
+        seen.add((x, o))
+
+        x_to_move = bin(o).count("1") == bin(x).count("1")
+        me, opponent = (x, o) if x_to_move else (o, x)
+        best_cell = None
+        best = -2
+        for cell in MOVE_ORDER:
+            bit = 1 << cell
+            if (x | o) & bit:
+                continue
+            score = -_negamax(opponent, me | bit, -2, 2)
+            if score > best:
+                best = score
+                best_cell = cell
+            positions.append((x | bit, o) if x_to_move else (x, o | bit))
+
+        value = best if x_to_move else -best
+        records.append(x | o << 9 | best_cell << 18 | (value + 1) << 22)
+
+    if sys.byteorder == "big":
+        records.byteswap()
+
+    # Write to a temporary file, readers never see half a book
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(records.tobytes())
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+    return len(records)
+
+
+def load_book(path=BOOK):
+    """
+    Loads a book file written by build_book, used by minimax from then on.
+    Raises ValueError if the file is truncated or holds an invalid record,
+    a move to a cell out of the board or already played.
+    """
+    global book
+    records = array("I")
+    with open(path, "rb") as f:
+        records.frombytes(f.read())
+    if sys.byteorder == "big":
+        records.byteswap()
+
+    entries = {}
+    for record in records:
+        x = record & FULL
+        o = (record >> 9) & FULL
+        cell = (record >> 18) & 0xF
+        value = ((record >> 22) & 0x3) - 1
+        if cell > 8 or (x | o) & (1 << cell) or x & o or value > 1:
+            raise ValueError("invalid opening book record")
+        entries[x | o << 9] = (cell, value)
+    book = entries
+    return book
+
+
+# Answer from the opening book whenever it has been built and is valid,
+# else minimax searches every position
+try:
+    load_book(BOOK)
+except (OSError, ValueError):
+    book = None
+
+
+if __name__ == "__main__":
+    print(f"{build_book(BOOK)} positions written to {BOOK}")
@@ -0,0 +1,78 @@
+"""
+Entailment time of each engine on random puzzles of growing size
+"""
+
+import argparse
+import time
+
+from generator import random_puzzle
+from logic import model_check
+
+ENGINES = ["enumerate", "compiled", "numpy", "parallel", "sat"]
+
+CHARACTERS = [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 16, 24, 32, 64]
+
+
+def benchmark(characters, engines, seed=0, timeout=5.0):
+    """
+    Times model_check of whether the first character is a knight, on a
+    random puzzle for each number of characters. An engine is no longer
+    run on larger puzzles once it takes more than timeout seconds.
+    Yields (characters, symbols, {engine: seconds or None}).
+    """
+    engines = list(engines)
+
+    # Warm up the engines, so that their imports are not timed
+    knowledge, roles = random_puzzle(2, seed)
+    for engine in engines:
+        model_check(knowledge, roles[0][0], engine=engine)
+
+    for n in characters:
+        knowledge, roles = random_puzzle(n, seed + n)
+        query = roles[0][0]
+
+        times = {}
+        answers = set()
+        for engine in list(engines):
+            start = time.perf_counter()
+            try:
+                answers.add(model_check(knowledge, query, engine=engine))
+            except ValueError:
+                # Too many symbols for the engine
+                engines.remove(engine)
+                times[engine] = None
+                continue
+            times[engine] = time.perf_counter() - start
+            if times[engine] > timeout:
+                engines.remove(engine)
+
+        if len(answers) > 1:
+            raise Exception(f"engines disagree on {n} characters")
+        yield n, 2 * n, times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--characters", type=int, nargs="+",
+                        default=CHARACTERS)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES,
+                        default=ENGINES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="seconds after which an engine is dropped")
+    args = parser.parse_args()
+
+    print(f"{'characters':>10} {'symbols':>8}"
+          + "".join(f" {engine:>10}" for engine in args.engines))
+    for n, symbols, times in benchmark(args.characters, args.engines,
+                                       args.seed, args.timeout):
+        cells = []
+        for engine in args.engines:
+            seconds = times.get(engine)
+            cells.append(f" {seconds:>10.4f}" if seconds is not None
+                         else f" {'-':>10}")
+        print(f"{n:>10} {symbols:>8}" + "".join(cells), flush=True)
+
+
+if __name__ == "__main__":
+    main()
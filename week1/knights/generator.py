@@ -0,0 +1,86 @@
+"""
+Random knights and knaves puzzles
+"""
+
+import random
+import string
+import sys
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+def character_names(n):
+    """
+    Returns n character names: A to Z, then P27, P28...
+    """
+    letters = string.ascii_uppercase
+    return [letters[i] if i < len(letters) else f"P{i + 1}" for i in range(n)]
+
+
+def random_statement(rng, roles, depth):
+    """
+    Returns a random sentence about the roles of the characters.
+    """
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(rng.choice(roles))
+
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(random_statement(rng, roles, depth - 1))
+    left = random_statement(rng, roles, depth - 1)
+    right = random_statement(rng, roles, depth - 1)
+    if kind == 1:
+        return And(left, right)
+    elif kind == 2:
+        return Or(left, right)
+    elif kind == 3:
+        return Implication(left, right)
+    return Biconditional(left, right)
+
+
+def random_puzzle(n, seed=None, depth=2):
+    """
+    Returns a random puzzle of n characters who each say one statement,
+    as its knowledge base and the list of (Knight, Knave) symbols of the
+    characters. Roles are drawn first and statements fitted to them, so
+    the knowledge base has at least one model.
+    """
+    rng = random.Random(seed)
+    roles = [(Symbol(f"{name} is a Knight"), Symbol(f"{name} is a Knave"))
+             for name in character_names(n)]
+    knights = {knight: rng.random() < 0.5 for knight, knave in roles}
+    model = {}
+    for knight, knave in roles:
+        model[knight.name] = knights[knight]
+        model[knave.name] = not knights[knight]
+
+    knowledge = And()
+    for knight, knave in roles:
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+
+    for knight, knave in roles:
+        # Knights say true statements, knaves false ones
+        statement = random_statement(rng, roles, depth)
+        if statement.evaluate(model) != knights[knight]:
+            statement = Not(statement)
+        knowledge.add(Implication(knight, statement))
+        knowledge.add(Implication(knave, Not(statement)))
+
+    return knowledge, roles
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python generator.py characters [seed]")
+    n = int(sys.argv[1])
+    seed = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    # Print one conjunct per line, as read back by parse
+    knowledge, roles = random_puzzle(n, seed)
+    for conjunct in knowledge.conjuncts:
+        print(conjunct.formula())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,49 @@
 import itertools
+import multiprocessing
+import os
+import re
+import weakref
+
+from sat import Solver
+
+# Answers of model_check_all
+ENTAILED = "entailed"
+REFUTED = "refuted"
+UNDETERMINED = "undetermined"
+
+# Fewer symbols than this are checked without starting processes
+PARALLEL_SYMBOLS = 18
 
 
 class Sentence():
+    """
+    Sentences are immutable and interned: constructing a sentence equal
+    to an existing one returns the existing one, so shared subsentences
+    are stored once. Hash and symbols are computed at construction.
+    And is the exception: every And is a new node, which can grow with
+    add until it is used in another sentence.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Sentences in use, by class and arguments
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, *arguments):
+        """
+        Returns the sentence of this class with these arguments, creating
+        it only if there is none yet.
+        """
+        key = (cls, arguments)
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            sentence.build(*arguments)
+            for operand in sentence.operands():
+                Sentence.freeze(operand)
+            Sentence.interned[key] = sentence
+        return sentence
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,13 +55,48 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self._symbols)
+
+    def operands(self):
+        """Returns the subsentences the logical sentence is made of."""
+        return ()
+
+    def expression(self, compiler):
+        """
+        Returns a Python expression evaluating the logical sentence over
+        an integer model `m`, from the locals the compiler assigned to
+        its subsentences.
+        """
+        raise Exception("nothing to compile")
+
+    def tseitin(self, encoder):
+        """
+        Adds clauses defining a new variable equivalent to the sentence
+        to the encoder's solver, returns its literal.
+        """
+        raise Exception("nothing to encode")
+
+    def columns(self, table):
+        """
+        Returns the truth table column of the logical sentence over all
+        the models of a TruthTable, as an array of packed bits.
+        """
+        raise Exception("nothing to tabulate")
 
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
             raise TypeError("must be a logical sentence")
 
+    @classmethod
+    def freeze(cls, sentence):
+        """
+        Stops a sentence used in another one from changing, since that
+        one caches its hash and symbols.
+        """
+        if isinstance(sentence, And):
+            sentence.frozen = True
+
     @classmethod
     def parenthesize(cls, s):
         """Parenthesizes an expression if not already parenthesized."""
@@ -43,15 +120,25 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        return cls.intern(name)
 
-    def __init__(self, name):
+    def build(self, name):
         self.name = name
+        self._hash = hash(("symbol", name))
+        self._symbols = frozenset([name])
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name)
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self._hash
+
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
@@ -65,47 +152,95 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def expression(self, compiler):
+        try:
+            return f"m >> {compiler.index[self.name]} & 1"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def tseitin(self, encoder):
+        return encoder.symbol(self.name)
+
+    def columns(self, table):
+        return table.symbol(self.name)
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
+        return cls.intern(operand)
+
+    def build(self, operand):
         self.operand = operand
+        self._hash = hash(("not", hash(operand)))
+        self._symbols = operand._symbols
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand)
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        return self._hash
+
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
 
+    def operands(self):
+        return (self.operand,)
+
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def expression(self, compiler):
+        return f"not {compiler.local(self.operand)}"
+
+    def tseitin(self, encoder):
+        return -encoder.literal(self.operand)
+
+    def columns(self, table):
+        return ~table.column(self.operand)
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts", "frozen")
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+
+        # And is not shared, so that it can be built up with add
+        sentence = object.__new__(cls)
+        sentence.build(*conjuncts)
+        sentence.frozen = False
+        for conjunct in conjuncts:
+            Sentence.freeze(conjunct)
+        return sentence
+
+    def build(self, *conjuncts):
+        self.conjuncts = conjuncts
+        self._hash = hash(
+            ("and", tuple(hash(conjunct) for conjunct in conjuncts))
+        )
+        self._symbols = frozenset().union(
+            *[conjunct._symbols for conjunct in conjuncts])
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts)
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        return self._hash
+
+    def __reduce__(self):
+        return (And, self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,8 +249,18 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        """
+        Adds a conjunct, before the sentence is used in other sentences.
+        Raises TypeError once it is.
+        """
         Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        if self.frozen:
+            raise TypeError("sentence is used in another sentence")
+        self.build(*self.conjuncts, conjunct)
+        Sentence.freeze(conjunct)
+
+    def operands(self):
+        return self.conjuncts
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,28 +271,60 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def expression(self, compiler):
+        if not self.conjuncts:
+            return "True"
+        return " and ".join(
+            [compiler.local(conjunct) for conjunct in self.conjuncts])
+
+    def tseitin(self, encoder):
+        literals = [encoder.literal(conjunct) for conjunct in self.conjuncts]
+        v = encoder.solver.new_variable()
+        for literal in literals:
+            encoder.solver.add_clause([-v, literal])
+        encoder.solver.add_clause([v] + [-literal for literal in literals])
+        return v
+
+    def columns(self, table):
+        column = table.true()
+        for conjunct in self.conjuncts:
+            column &= table.column(conjunct)
+        return column
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls.intern(*disjuncts)
+
+    def build(self, *disjuncts):
+        self.disjuncts = disjuncts
+        self._hash = hash(
+            ("or", tuple(hash(disjunct) for disjunct in disjuncts))
+        )
+        self._symbols = frozenset().union(
+            *[disjunct._symbols for disjunct in disjuncts])
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts)
 
     def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        return self._hash
+
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
+    def operands(self):
+        return self.disjuncts
+
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
@@ -157,28 +334,59 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def expression(self, compiler):
+        if not self.disjuncts:
+            return "False"
+        return " or ".join(
+            [compiler.local(disjunct) for disjunct in self.disjuncts])
+
+    def tseitin(self, encoder):
+        literals = [encoder.literal(disjunct) for disjunct in self.disjuncts]
+        v = encoder.solver.new_variable()
+        for literal in literals:
+            encoder.solver.add_clause([v, -literal])
+        encoder.solver.add_clause([-v] + literals)
+        return v
+
+    def columns(self, table):
+        column = table.false()
+        for disjunct in self.disjuncts:
+            column |= table.column(disjunct)
+        return column
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
+        return cls.intern(antecedent, consequent)
+
+    def build(self, antecedent, consequent):
         self.antecedent = antecedent
         self.consequent = consequent
+        self._hash = hash(("implies", hash(antecedent), hash(consequent)))
+        self._symbols = antecedent._symbols | consequent._symbols
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return self._hash
+
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
+    def operands(self):
+        return (self.antecedent, self.consequent)
+
     def evaluate(self, model):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
@@ -188,28 +396,56 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def expression(self, compiler):
+        antecedent = compiler.local(self.antecedent)
+        consequent = compiler.local(self.consequent)
+        return f"not {antecedent} or {consequent}"
+
+    def tseitin(self, encoder):
+        antecedent = encoder.literal(self.antecedent)
+        consequent = encoder.literal(self.consequent)
+        v = encoder.solver.new_variable()
+        encoder.solver.add_clause([-v, -antecedent, consequent])
+        encoder.solver.add_clause([v, antecedent])
+        encoder.solver.add_clause([v, -consequent])
+        return v
+
+    def columns(self, table):
+        return ~table.column(self.antecedent) | table.column(self.consequent)
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
+        return cls.intern(left, right)
+
+    def build(self, left, right):
         self.left = left
         self.right = right
+        self._hash = hash(("biconditional", hash(left), hash(right)))
+        self._symbols = left._symbols | right._symbols
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional)
+            and self.left == other.left
+            and self.right == other.right)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return self._hash
+
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
+    def operands(self):
+        return (self.left, self.right)
+
     def evaluate(self, model):
         return ((self.left.evaluate(model)
                  and self.right.evaluate(model))
@@ -217,16 +453,242 @@ class Biconditional(Sentence):
                     and not self.right.evaluate(model)))
 
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
+        left = Sentence.parenthesize(self.left.formula())
+        right = Sentence.parenthesize(self.right.formula())
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def expression(self, compiler):
+        left = compiler.local(self.left)
+        right = compiler.local(self.right)
+        return f"{left} == {right}"
+
+    def tseitin(self, encoder):
+        left = encoder.literal(self.left)
+        right = encoder.literal(self.right)
+        v = encoder.solver.new_variable()
+        encoder.solver.add_clause([-v, -left, right])
+        encoder.solver.add_clause([-v, left, -right])
+        encoder.solver.add_clause([v, left, right])
+        encoder.solver.add_clause([v, -left, -right])
+        return v
+
+    def columns(self, table):
+        return ~(table.column(self.left) ^ table.column(self.right))
+
+
+class Parser():
+    """
+    Parses sentences written as formula() writes them:
+        ¬A, A ∧ B, A ∨ B, A => B, A <=> B and parentheses,
+    from the tightest to the loosest binding operator. Symbol names are
+    the text between operators, so they may contain spaces.
+    """
+
+    OPERATORS = re.compile(r"(<=>|=>|¬|∧|∨|\(|\))")
+
+    def __init__(self, text):
+        self.tokens = [token.strip() for token in self.OPERATORS.split(text)
+                       if token.strip()]
+        self.position = 0
+
+    def parse(self):
+        sentence = self.biconditional()
+        if self.position < len(self.tokens):
+            raise ValueError(f"unexpected {self.tokens[self.position]}")
+        return sentence
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def take(self, token=None):
+        current = self.peek()
+        if current is None:
+            raise ValueError("unexpected end of formula")
+        if token is not None and current != token:
+            raise ValueError(f"expected {token}, found {current}")
+        self.position += 1
+        return current
+
+    def biconditional(self):
+        sentence = self.implication()
+        while self.peek() == "<=>":
+            self.take()
+            sentence = Biconditional(sentence, self.implication())
+        return sentence
+
+    def implication(self):
+        sentence = self.disjunction()
+        if self.peek() == "=>":
+            self.take()
+            return Implication(sentence, self.implication())
+        return sentence
+
+    def disjunction(self):
+        disjuncts = [self.conjunction()]
+        while self.peek() == "∨":
+            self.take()
+            disjuncts.append(self.conjunction())
+        return disjuncts[0] if len(disjuncts) == 1 else Or(*disjuncts)
+
+    def conjunction(self):
+        conjuncts = [self.negation()]
+        while self.peek() == "∧":
+            self.take()
+            conjuncts.append(self.negation())
+        return conjuncts[0] if len(conjuncts) == 1 else And(*conjuncts)
+
+    def negation(self):
+        token = self.take()
+        if token == "¬":
+            return Not(self.negation())
+        elif token == "(":
+            sentence = self.biconditional()
+            self.take(")")
+            return sentence
+        elif self.OPERATORS.fullmatch(token):
+            raise ValueError(f"unexpected {token}")
+        return Symbol(token)
+
+
+def parse(text):
+    """
+    Returns the sentence of a formula, as written by formula(). The
+    formula of a sentence parses back to that same sentence, except for
+    And and Or of a single operand, written as the operand alone and so
+    read back as it, and And() of none, whose empty formula is rejected.
+    """
+    return Parser(text).parse()
+
+
+class Compiler():
+    """
+    Compiles sentences into straight-line Python code: every distinct
+    subsentence is computed once, into a local of its own, from the
+    locals of its subsentences. Locals hold 0 or 1, True or False.
+    """
+
+    def __init__(self, symbols):
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+
+        # Lines of the function body, locals of the sentences compiled
+        self.lines = []
+        self.locals = {}
+
+    def local(self, sentence):
+        """
+        Returns the local holding the value of a sentence, computing it
+        once, after the locals of its subsentences. Subsentences are
+        visited with a stack, so deep sentences do not recurse.
+        """
+        stack = [sentence]
+        while stack:
+            current = stack[-1]
+            if current in self.locals:
+                stack.pop()
+                continue
+            pending = [operand for operand in current.operands()
+                       if operand not in self.locals]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            name = f"t{len(self.locals)}"
+            self.lines.append(f"    {name} = {current.expression(self)}")
+            self.locals[current] = name
+        return self.locals[sentence]
+
+    def function(self, sentence):
+        """Returns the source of a function f(m) evaluating a sentence."""
+        result = self.local(sentence)
+        return "\n".join(["def f(m):", *self.lines,
+                          f"    return bool({result})"])
+
+
+def compile_sentence(sentence, symbols=None):
+    """
+    Compiles a sentence into a function of an integer model, whose bit i
+    is the value of symbols[i], returning the same as evaluate would.
+    Symbols default to the sorted symbols of the sentence.
+    Returns the function and the list of symbols.
+    """
+    if symbols is None:
+        symbols = sorted(sentence.symbols())
+    namespace = {}
+    exec(Compiler(symbols).function(sentence), namespace)
+    return namespace["f"], list(symbols)
+
+
+def model_to_bits(model, symbols):
+    """
+    Returns the integer model of a dictionary model, bit i for symbols[i].
+    """
+    bits = 0
+    for i, symbol in enumerate(symbols):
+        if model[symbol]:
+            bits |= 1 << i
+    return bits
+
+
+class Encoder():
+    """
+    Tseitin encoding of sentences into the clauses of a SAT solver:
+    every subsentence is given a variable equivalent to it, so the
+    clauses grow linearly with the sentences.
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver if solver is not None else Solver()
+
+        # Variables of the symbols, literals of the sentences encoded
+        self.variables = {}
+        self.literals = {}
+
+    def symbol(self, name):
+        if name not in self.variables:
+            self.variables[name] = self.solver.new_variable()
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """
+        Returns the literal equivalent to a sentence, encoding it once.
+        """
+        literal = self.literals.get(sentence)
+        if literal is None:
+            literal = sentence.tseitin(self)
+            self.literals[sentence] = literal
+        return literal
+
+    def assert_sentence(self, sentence):
+        """
+        Adds the sentence to the clauses, returns False if they became
+        unsatisfiable.
+        """
+        return self.solver.add_clause([self.literal(sentence)])
+
+
+def model_check(knowledge, query, engine="enumerate"):
+    """
+    Checks if knowledge base entails query.
+
+    engine is "enumerate" to evaluate the sentences on every model,
+    "compiled" to run compiled sentences on every integer model,
+    "numpy" to compute the truth tables of the sentences at once,
+    "parallel" to run compiled sentences in a pool of processes,
+    or "sat" to search for a model of knowledge and not query.
+    """
+    if engine == "compiled":
+        return compiled_model_check(knowledge, query)
+    elif engine == "numpy":
+        from truthtable import truth_table_check
+        return truth_table_check(knowledge, query)
+    elif engine == "parallel":
+        return parallel_model_check(knowledge, query)
+    elif engine == "sat":
+        return sat_model_check(knowledge, query)
+    elif engine != "enumerate":
+        raise ValueError(f"unknown engine {engine}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -261,3 +723,218 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def compiled_model_check(knowledge, query):
+    """Checks if knowledge base entails query, with compiled sentences."""
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    entailed, _ = compile_sentence(Implication(knowledge, query), symbols)
+    return all(entailed(model) for model in range(2 ** len(symbols)))
+
+
+def parallel_model_check(knowledge, query, processes=None, shard_bits=None):
+    """
+    Checks if knowledge base entails query with a pool of processes.
+
+    The first shard_bits symbols are fixed to each of their values in
+    turn, splitting the models into independent shards checked with
+    compiled sentences. Shards default to 4 per process, so that busy
+    processes can be balanced. The pool is stopped as soon as a shard
+    has a counter-model.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    if shard_bits is None and len(symbols) < PARALLEL_SYMBOLS:
+        return compiled_model_check(knowledge, query)
+
+    processes = processes or os.cpu_count()
+    if shard_bits is None:
+        shard_bits = (4 * processes - 1).bit_length()
+    shard_bits = min(shard_bits, len(symbols))
+
+    sentence = Implication(knowledge, query)
+    with multiprocessing.Pool(processes, initializer=_start_shards,
+                              initargs=(sentence, symbols, shard_bits)) as pool:
+        shards = pool.imap_unordered(_check_shard, range(2 ** shard_bits))
+        for entailed in shards:
+            if not entailed:
+                return False
+    return True
+
+
+# Compiled sentences and sizes of the shards checked by this process
+_sharding = None
+
+
+def _start_shards(sentence, symbols, shard_bits):
+    global _sharding
+    entailed, _ = compile_sentence(sentence, symbols)
+    _sharding = (entailed, len(symbols), shard_bits)
+
+
+def _check_shard(shard):
+    """
+    Checks the models whose first symbols have the values of the bits
+    of shard.
+    """
+    entailed, count, shard_bits = _sharding
+    return all(entailed(rest << shard_bits | shard)
+               for rest in range(2 ** (count - shard_bits)))
+
+
+def sat_model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, that is if there is no model
+    of knowledge where query is false, with a SAT solver.
+    """
+    encoder = Encoder()
+    encoder.assert_sentence(knowledge)
+    encoder.assert_sentence(Not(query))
+    return not encoder.solver.solve()
+
+
+def model_check_all(knowledge, queries, engine="enumerate"):
+    """
+    Checks a batch of queries against one knowledge base, whose models
+    are enumerated once for all of them, with the engines of model_check.
+
+    Returns a dictionary mapping each query to ENTAILED if knowledge
+    entails it, REFUTED if knowledge entails its negation, UNDETERMINED
+    otherwise. Inconsistent knowledge entails every query.
+    """
+    queries = list(queries)
+    if engine == "numpy":
+        from truthtable import truth_table_check_all
+        return truth_table_check_all(knowledge, queries)
+    elif engine == "sat":
+        return sat_model_check_all(knowledge, queries)
+    elif engine == "parallel":
+        return parallel_model_check_all(knowledge, queries)
+
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    if engine == "compiled":
+        holds, _ = compile_sentence(knowledge, symbols)
+        models = filter(holds, range(2 ** len(symbols)))
+        evaluate = [compile_sentence(query, symbols)[0] for query in queries]
+    elif engine == "enumerate":
+        models = filter(knowledge.evaluate, (
+            dict(zip(symbols, values))
+            for values in itertools.product([True, False], repeat=len(symbols))
+        ))
+        evaluate = [query.evaluate for query in queries]
+    else:
+        raise ValueError(f"unknown engine {engine}")
+
+    values = truth_values(models, evaluate)
+    return {query: entailment(query_values)
+            for query, query_values in zip(queries, values)}
+
+
+def truth_values(models, evaluate):
+    """
+    Returns the set of truth values each query takes in the models, given
+    the functions evaluating the queries. Models are read one at a time,
+    and no longer once every query has taken both values.
+    """
+    values = [set() for _ in evaluate]
+    undecided = list(zip(evaluate, values))
+    for model in models:
+        for query_evaluate, query_values in undecided:
+            query_values.add(bool(query_evaluate(model)))
+        if any(len(query_values) == 2 for _, query_values in undecided):
+            undecided = [(query_evaluate, query_values)
+                         for query_evaluate, query_values in undecided
+                         if len(query_values) < 2]
+            if not undecided:
+                break
+    return values
+
+
+def parallel_model_check_all(knowledge, queries, processes=None,
+                             shard_bits=None):
+    """
+    Checks a batch of queries against one knowledge base with a pool of
+    processes, each reading the models of knowledge in its own shards as
+    parallel_model_check does. The pool is stopped as soon as every
+    query is UNDETERMINED.
+    """
+    queries = list(queries)
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    if shard_bits is None and len(symbols) < PARALLEL_SYMBOLS:
+        return model_check_all(knowledge, queries, engine="compiled")
+
+    processes = processes or os.cpu_count()
+    if shard_bits is None:
+        shard_bits = (4 * processes - 1).bit_length()
+    shard_bits = min(shard_bits, len(symbols))
+
+    values = [set() for _ in queries]
+    with multiprocessing.Pool(
+        processes, initializer=_start_query_shards,
+        initargs=(knowledge, queries, symbols, shard_bits)
+    ) as pool:
+        shards = pool.imap_unordered(_check_query_shard,
+                                     range(2 ** shard_bits))
+        for shard_values in shards:
+            for query_values, found in zip(values, shard_values):
+                query_values |= found
+            if all(len(query_values) == 2 for query_values in values):
+                break
+    return {query: entailment(query_values)
+            for query, query_values in zip(queries, values)}
+
+
+def _start_query_shards(knowledge, queries, symbols, shard_bits):
+    global _sharding
+    holds, _ = compile_sentence(knowledge, symbols)
+    evaluate = [compile_sentence(query, symbols)[0] for query in queries]
+    _sharding = (holds, evaluate, len(symbols), shard_bits)
+
+
+def _check_query_shard(shard):
+    """
+    Returns the truth values of the queries in the models of knowledge
+    whose first symbols have the values of the bits of shard.
+    """
+    holds, evaluate, count, shard_bits = _sharding
+    models = (rest << shard_bits | shard
+              for rest in range(2 ** (count - shard_bits)))
+    return truth_values(filter(holds, models), evaluate)
+
+
+def entailment(values):
+    """
+    Returns the answer for a query taking these truth values in the
+    models of the knowledge base.
+    """
+    if False not in values:
+        return ENTAILED
+    elif True not in values:
+        return REFUTED
+    return UNDETERMINED
+
+
+def sat_model_check_all(knowledge, queries):
+    """
+    Checks a batch of queries with one SAT solver, which keeps what it
+    learns from one query to the next. Every model found tells the value
+    of all the queries in it, so most queries need no search of their own.
+    """
+    encoder = Encoder()
+    encoder.assert_sentence(knowledge)
+    literals = {query: encoder.literal(query) for query in queries}
+
+    # Truth values of each query in the models found
+    values = {query: set() for query in queries}
+    for query, literal in literals.items():
+        for value in (True, False):
+            if value in values[query]:
+                continue
+            if encoder.solver.solve([literal if value else -literal]):
+                model = encoder.solver.model
+                for other, other_literal in literals.items():
+                    values[other].add(
+                        model[abs(other_literal)] == (other_literal > 0))
+
+    return {query: entailment(values[query]) for query in queries}
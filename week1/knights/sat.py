@@ -0,0 +1,289 @@
+import heapq
+
+
+class Solver():
+    """
+    CDCL SAT solver over clauses of integer literals: variable v is the
+    literal v when true and -v when false, as in DIMACS.
+
+    Unit propagation uses two watched literals per clause, conflicts are
+    analysed to their first unique implication point and learned, and
+    decisions follow VSIDS activities with saved phases.
+    """
+
+    def __init__(self):
+        self.ok = True
+        self.clauses = []
+        self.learned = []
+        self.model = None
+
+        # Clauses watching a literal, visited when the literal becomes false
+        self.watches = {}
+
+        # Per variable, index 0 unused: value (1, -1 or 0 unassigned),
+        # decision level, reason clause, activity and saved phase
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.order = []
+        self.increment = 1.0
+
+        # Assigned literals in order, with the start of each decision level
+        self.trail = []
+        self.trail_lim = []
+        self.head = 0
+
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+
+    def new_variable(self):
+        """
+        Returns a new variable.
+        """
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        variable = len(self.values) - 1
+        heapq.heappush(self.order, (0.0, variable))
+        return variable
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, returns False if the clauses became unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        for literal in literals:
+            while abs(literal) >= len(self.values):
+                self.new_variable()
+
+        # Drop duplicated and false literals, skip satisfied clauses
+        clause = []
+        for literal in literals:
+            if -literal in clause or self.value(literal) == 1:
+                return True
+            if literal not in clause and self.value(literal) == 0:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.clauses.append(clause)
+            self.attach(clause)
+        return self.ok
+
+    def attach(self, clause):
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.trail_lim)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Propagates the assignments of the trail.
+        Returns a conflicting clause, or None.
+        """
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+
+            watching = self.watches.get(false_literal, [])
+            kept = []
+            i = 0
+            while i < len(watching):
+                clause = watching[i]
+                i += 1
+
+                # Keep the false literal second
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) == 1:
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal which is not false, if any
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(clause[0]) == -1:
+                        kept.extend(watching[i:])
+                        self.watches[false_literal] = kept
+                        return clause
+                    self.assign(clause[0], clause)
+
+            self.watches[false_literal] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from a conflict, its asserting literal
+        first, and the level to backjump to.
+        """
+        level = len(self.trail_lim)
+        learned = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Walk back the trail to the next literal of the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal of the highest level after the asserting one
+        highest = max(range(1, len(learned)),
+                      key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            for v in range(1, len(self.activity)):
+                self.activity[v] *= 1e-100
+            self.increment *= 1e-100
+            self.order = [(-self.activity[v], v)
+                          for v in range(1, len(self.values))]
+            heapq.heapify(self.order)
+        else:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def backtrack(self, level):
+        """
+        Undoes every assignment above a decision level.
+        """
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            self.phase[variable] = literal > 0
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.head = len(self.trail)
+
+    def pick(self):
+        """
+        Returns the unassigned variable of highest activity, or None.
+        """
+        while self.order:
+            _, variable = heapq.heappop(self.order)
+            if self.values[variable] == 0:
+                return variable
+        for variable in range(1, len(self.values)):
+            if self.values[variable] == 0:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with the assumed
+        literals true, keeping a model of them in self.model.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        for literal in assumptions:
+            while abs(literal) >= len(self.values):
+                self.new_variable()
+
+        restart = 100
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.learned.append(learned)
+                    self.attach(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= 0.95
+
+                # Restart from time to time, keeping what was learned
+                if conflicts >= restart:
+                    conflicts = 0
+                    restart = int(restart * 1.5)
+                    self.backtrack(0)
+                continue
+
+            # Assumptions are decided first, one per decision level
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                if self.value(literal) == -1:
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if self.value(literal) == 0:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.pick()
+            if variable is None:
+                self.model = [value == 1 for value in self.values]
+                self.backtrack(0)
+                return True
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.assign(variable if self.phase[variable] else -variable, None)
@@ -0,0 +1,145 @@
+"""
+Truth tables of sentences over all models at once, with NumPy
+"""
+
+import numpy as np
+
+from logic import entailment
+
+# Truth tables take 2 ** n bits per column, 8 MiB at this many symbols.
+# A check holds the columns of the subsentences shared by several parents
+# until their last parent is built, plus a few per level of nesting:
+# about 30 columns, 240 MiB, for a generated puzzle of 13 characters
+MAX_SYMBOLS = 26
+
+ALL = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+class TruthTable():
+    """
+    Columns of packed bits, one per sentence, where bit m of a column is
+    the value of the sentence in model m: the model whose bit i is the
+    value of symbols[i]. Bits of each 64 bit word go from least to most
+    significant, so operators on columns are bitwise operators on words.
+    """
+
+    def __init__(self, symbols, sentences=()):
+        """
+        `sentences` are the sentences whose columns will be asked for,
+        once per time they are listed. Only their subsentences with more
+        than one parent are cached, until their last parent is built.
+        """
+        if len(symbols) > MAX_SYMBOLS:
+            raise ValueError(
+                f"{len(symbols)} symbols, at most {MAX_SYMBOLS} in a table")
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.words = max(1, 2 ** len(self.symbols) // 64)
+
+        # Bits of the words which are models, all unless there are few symbols
+        if len(self.symbols) < 6:
+            self.mask = np.uint64(2 ** 2 ** len(self.symbols) - 1)
+        else:
+            self.mask = ALL
+
+        # Uses left of every subsentence, columns of the shared ones
+        self.uses = {}
+        self.cache = {}
+        self.count_uses(sentences)
+
+    def true(self):
+        return np.full(self.words, ALL, dtype=np.uint64)
+
+    def false(self):
+        return np.zeros(self.words, dtype=np.uint64)
+
+    def symbol(self, name):
+        """
+        Returns the column of a symbol: within a word for the first 6
+        symbols, alternating blocks of words for the next ones.
+        """
+        try:
+            i = self.index[name]
+        except KeyError:
+            raise Exception(f"variable {name} not in model")
+        if i < 6:
+            word = sum(1 << bit for bit in range(64) if bit >> i & 1)
+            return np.full(self.words, word, dtype=np.uint64)
+        blocks = np.arange(self.words) >> (i - 6) & 1
+        return np.where(blocks == 1, ALL, np.uint64(0))
+
+    def count_uses(self, sentences):
+        """
+        Counts the uses of the sentences and of their subsentences: one
+        per listing of a sentence, one per parent of a subsentence.
+        """
+        seen = set()
+        stack = []
+        for sentence in sentences:
+            self.uses[sentence] = self.uses.get(sentence, 0) + 1
+            stack.append(sentence)
+        while stack:
+            sentence = stack.pop()
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+            for operand in sentence.operands():
+                self.uses[operand] = self.uses.get(operand, 0) + 1
+                stack.append(operand)
+
+    def column(self, sentence):
+        """
+        Returns the column of a sentence, computing it once while it has
+        uses left. Columns are shared and must not be modified in place.
+        """
+        column = self.cache.get(sentence)
+        if column is None:
+            column = sentence.columns(self)
+        uses = self.uses.get(sentence, 0) - 1
+        if uses > 0:
+            self.uses[sentence] = uses
+            self.cache[sentence] = column
+        else:
+            self.uses.pop(sentence, None)
+            self.cache.pop(sentence, None)
+        return column
+
+    def models(self, sentence):
+        """
+        Returns the number of models where a sentence is true.
+        """
+        column = self.column(sentence) & self.mask
+        return int(np.unpackbits(column.view(np.uint8)).sum())
+
+
+def truth_table_check(knowledge, query):
+    """
+    Checks if knowledge base entails query: no model of the truth table
+    has knowledge true and query false.
+    """
+    table = TruthTable(sorted(set.union(knowledge.symbols(), query.symbols())),
+                       [knowledge, query])
+    counter_models = table.column(knowledge) & ~table.column(query)
+    return not np.any(counter_models & table.mask)
+
+
+def truth_table_check_all(knowledge, queries):
+    """
+    Checks a batch of queries against the models of knowledge, computed
+    once, as in logic.model_check_all.
+    """
+    symbols = set.union(knowledge.symbols(),
+                        *[query.symbols() for query in queries])
+    table = TruthTable(sorted(symbols), [knowledge, *queries])
+    models = table.column(knowledge) & table.mask
+
+    results = {}
+    for query in queries:
+        column = table.column(query)
+        values = set()
+        if np.any(models & column):
+            values.add(True)
+        if np.any(models & ~column):
+            values.add(False)
+        results[query] = entailment(values)
+    return results
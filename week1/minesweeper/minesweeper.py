@@ -137,6 +137,110 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class KnowledgeBase():
+    """
+    Sentences known to be true, indexed by the cells they contain
+    Marking a cell only updates the sentences containing it, and
+    sentences changed since the last call to changed() are tracked,
+    so that only they need to be checked for new safes and mines.
+    """
+
+    def __init__(self):
+
+        # Sentences by id, and ids of the sentences containing each cell
+        self.sentences = {}
+        self.by_cell = {}
+
+        # Ids of sentences added or updated since changed() was called
+        self.updated = set()
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __contains__(self, sentence):
+        return self.find(sentence) is not None
+
+    def find(self, sentence):
+        """
+        Returns the id of a sentence equal to the given one, or None.
+        """
+        if id(sentence) in self.sentences:
+            return id(sentence)
+        for key in self.containing(next(iter(sentence.cells), None)):
+            if self.sentences[key] == sentence:
+                return key
+        return None
+
+    def containing(self, cell):
+        """
+        Returns the ids of the sentences containing a cell.
+        """
+        return self.by_cell.get(cell, ())
+
+    def overlapping(self, cells):
+        """
+        Returns the sentences containing any of the cells.
+        """
+        keys = set()
+        for cell in cells:
+            keys.update(self.containing(cell))
+        return [self.sentences[key] for key in keys]
+
+    def append(self, sentence):
+        """
+        Adds a sentence, unless it has no cell left.
+        """
+        if len(sentence.cells) == 0:
+            return
+        key = id(sentence)
+        self.sentences[key] = sentence
+        self.updated.add(key)
+        for cell in sentence.cells:
+            self.by_cell.setdefault(cell, set()).add(key)
+
+    def remove(self, sentence):
+        key = self.find(sentence)
+        if key is None:
+            raise ValueError("sentence not in knowledge base")
+        self.discard(key)
+
+    def discard(self, key):
+        sentence = self.sentences.pop(key)
+        self.updated.discard(key)
+        for cell in sentence.cells:
+            self.by_cell[cell].discard(key)
+            if not self.by_cell[cell]:
+                del self.by_cell[cell]
+
+    def mark_mine(self, cell):
+        for key in self.by_cell.pop(cell, ()):
+            self.sentences[key].mark_mine(cell)
+            self.update(key)
+
+    def mark_safe(self, cell):
+        for key in self.by_cell.pop(cell, ()):
+            self.sentences[key].mark_safe(cell)
+            self.update(key)
+
+    def update(self, key):
+        # If the sentence is now empty, remove it from the knowledge base
+        if len(self.sentences[key].cells) == 0:
+            self.discard(key)
+        else:
+            self.updated.add(key)
+
+    def changed(self):
+        """
+        Returns the sentences added or updated since the last call.
+        """
+        sentences = [self.sentences[key] for key in self.updated]
+        self.updated = set()
+        return sentences
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
@@ -155,8 +259,8 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, indexed by cell
+        self.knowledge = KnowledgeBase()
 
     def mark_mine(self, cell):
         """
@@ -164,11 +268,7 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge.copy():
-            sentence.mark_mine(cell)
-            # If the sentence is now empty, remove it from the knowledge base
-            if (sentence.cells) == 0:
-                self.knowledge.remove(sentence)
+        self.knowledge.mark_mine(cell)
 
     def mark_safe(self, cell):
         """
@@ -176,11 +276,7 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
-            # If the sentence is now empty, remove it from the knowledge base
-            if len(sentence.cells) == 0:
-                self.knowledge.remove(sentence)
+        self.knowledge.mark_safe(cell)
 
     def add_knowledge(self, cell, count):
         """
@@ -220,8 +316,8 @@ class MinesweeperAI():
                 self.knowledge.append(newSentence)
                 self.process_knowledge(surroundings, count)
 
-                # Look for subsets in the knowledge base
-                for sentence in self.knowledge.copy():
+                # Look for subsets among the sentences sharing a cell
+                for sentence in self.knowledge.overlapping(newSentence.cells):
                     if sentence != newSentence and len(sentence.cells) > 0:
                         # There is a subset of the new sentence in the knowledge base
                         if sentence.cells.issubset(newSentence.cells) and sentence != newSentence:
@@ -300,11 +396,12 @@ class MinesweeperAI():
                 self.mark_mine(cell)
 
 
-# Remove empty knowledge and update knowledge
+# Update knowledge from the sentences changed, until no sentence changes
 
     def clean_knowledge(self):
-        for knowledge in self.knowledge:
-            if len(knowledge.cells) == 0:
-                self.knowledge.remove(knowledge)
-            else:
-                self.process_knowledge(knowledge.cells, knowledge.count)
+        changed = self.knowledge.changed()
+        while changed:
+            for knowledge in changed:
+                if len(knowledge.cells) > 0:
+                    self.process_knowledge(knowledge.cells, knowledge.count)
+            changed = self.knowledge.changed()